@@ -0,0 +1,53 @@
+from sys import executable, exit
+from subprocess import run
+from statistics import median
+from argparse import ArgumentParser
+
+
+# Modules that must not be loaded by the package import nor by the creation of an empty Exporter
+HEAVY_MODULES = ['k3d', 'vtk', 'vedo', 'colour', 'Sofa']
+
+# Statements timed in fresh interpreters
+STATEMENTS = ['import SimExporter.core',
+              'import SimExporter.sofa',
+              'from SimExporter.core import Exporter; Exporter()']
+
+# Script run in a fresh interpreter: time the statement and list the loaded heavy modules
+SCRIPT = f'''
+import sys
+from time import perf_counter
+start = perf_counter()
+{{statement}}
+print(perf_counter() - start)
+print(','.join(m for m in {HEAVY_MODULES} if m in sys.modules))
+'''
+
+
+# Parse the benchmark options
+parser = ArgumentParser(description='Measure the import time of the SimExporter packages.')
+parser.add_argument('--runs', type=int, default=5, help='Number of imports in fresh interpreters.')
+parser.add_argument('--max-time', type=float, default=0.3, help='Maximal median time of each statement in seconds.')
+args = parser.parse_args()
+
+
+# Run each statement in fresh interpreters
+failed = False
+for statement in STATEMENTS:
+    times, loaded = [], set()
+    for _ in range(args.runs):
+        output = run([executable, '-c', SCRIPT.format(statement=statement)], capture_output=True, text=True,
+                     check=True)
+        elapsed, heavy = output.stdout.splitlines()
+        times.append(float(elapsed))
+        loaded.update(m for m in heavy.split(',') if m != '')
+
+    # Check the time and the loaded modules
+    print(f'{statement}: {median(times) * 1000:.1f} ms (median of {args.runs} runs)')
+    if median(times) > args.max_time:
+        print(f'  -> slower than {args.max_time * 1000:.0f} ms')
+        failed = True
+    if len(loaded) > 0:
+        print(f'  -> heavy dependencies loaded: {", ".join(sorted(loaded))}')
+        failed = True
+
+exit(1 if failed else 0)
@@ -22,7 +22,9 @@ exporter.objects.add_mesh(positions=mesh.vertices,
 exporter.objects.add_mesh(positions=tetra.vertices,
                           cells=tetra.cells,
                           color='#1c71d8',
-                          alpha=0.05)
+                          alpha=0.05,
+                          boundary=True,
+                          compact=True)
 
 
 # Export to HTML with custom camera parameters
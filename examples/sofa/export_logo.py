@@ -47,6 +47,9 @@ if __name__ == '__main__':
     Sofa.Gui.GUIManager.MainLoop(node)
     Sofa.Gui.GUIManager.closeGUI()
 
+    # End the recording
+    exporter.close()
+
     # Export to HTML file
     exporter.set_camera(factor=0.8, yaw=0, pitch=0)
     exporter.to_html(filename=join('html', 'sofa.html'), background_color='black', grid_visible=False,
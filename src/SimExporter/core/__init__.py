@@ -1 +1,22 @@
-from SimExporter.core.exporter import Exporter
+from typing import TYPE_CHECKING, Any, List
+from importlib import import_module
+
+if TYPE_CHECKING:
+    from SimExporter.core.exporter import Exporter
+    from SimExporter.core.batch import export_batch
+
+# The API is imported on first access so that the heavy dependencies (k3d, vtk, vedo) are only loaded when used
+_LAZY_ATTRIBUTES = {'Exporter': 'SimExporter.core.exporter',
+                    'export_batch': 'SimExporter.core.batch'}
+
+
+def __getattr__(name: str) -> Any:
+    if name in _LAZY_ATTRIBUTES:
+        value = getattr(import_module(_LAZY_ATTRIBUTES[name]), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module '{__name__}' has no attribute '{name}'")
+
+
+def __dir__() -> List[str]:
+    return sorted(set(globals().keys()) | set(_LAZY_ATTRIBUTES.keys()))
@@ -0,0 +1,105 @@
+from typing import Optional, Dict, List, Union
+from os import makedirs, replace, getpid
+from os.path import join, dirname, exists
+from re import split
+from base64 import b64encode
+from zlib import compress
+from importlib.metadata import version
+
+from SimExporter import __version__
+
+
+# Directory that contains the javascript files and the standalone snapshot
+STATIC_DIR = join(dirname(dirname(__file__)), 'static')
+
+# Placeholders of the template that are filled at each export
+PLACEHOLDERS = ['DATA', 'SIDECARS']
+
+# Process-wide cache of the ready-to-use templates
+_TEMPLATES: Dict[str, List[Union[bytes, str]]] = {}
+
+
+def get_template(cache_dir: Optional[str] = None) -> List[Union[bytes, str]]:
+    """
+    Get the standalone HTML template with the javascript sources already embedded, split at its placeholders: the
+    literal parts (bytes) alternate with the names of the placeholders to fill (str). The template is built once per
+    process, then reused without reading or compressing the static files again.
+
+    :param cache_dir: If provided, the template is also cached on disk in this directory so that other processes can
+                      reuse it.
+    """
+
+    # Templates are keyed by the versions of k3d and SimExporter
+    key = _template_key()
+
+    # Case 1: the template was already built in this process
+    if key in _TEMPLATES:
+        return _TEMPLATES[key]
+
+    # Case 2: the template was already built by another process and cached on disk
+    cache_file = None if cache_dir is None else join(cache_dir, f'template_{key}.html')
+    if cache_file is not None and exists(cache_file):
+        with open(cache_file, 'r', encoding='utf-8') as file:
+            _TEMPLATES[key] = split_template(file.read())
+        return _TEMPLATES[key]
+
+    # Case 3: build the template from the static files
+    content = build_template()
+    _TEMPLATES[key] = split_template(content)
+    if cache_file is not None:
+        if not exists(cache_dir):
+            makedirs(cache_dir, exist_ok=True)
+        # Write in a temporary file first so that concurrent processes never read a partial template
+        tmp_file = f'{cache_file}.{getpid()}.tmp'
+        with open(tmp_file, 'w', encoding='utf-8') as file:
+            file.write(content)
+        replace(tmp_file, cache_file)
+    return _TEMPLATES[key]
+
+
+def set_template(template: List[Union[bytes, str]]) -> None:
+    """
+    Set the template of the current process, to share a template already built by another process.
+
+    :param template: Split template, see get_template.
+    """
+
+    _TEMPLATES[_template_key()] = template
+
+
+def _template_key() -> str:
+    """
+    Get the key of the template, defined by the versions of k3d and SimExporter.
+    """
+
+    return f'k3d-{version("k3d")}_simexporter-{__version__}'
+
+
+def build_template() -> str:
+    """
+    Fill the standalone snapshot with the javascript sources.
+    """
+
+    with open(join(STATIC_DIR, 'snapshot_standalone.txt'), 'r', encoding='utf-8') as file:
+        content = file.read()
+    with open(join(STATIC_DIR, 'standalone.js'), 'r', encoding='utf-8') as file:
+        content = content.replace('[K3D_SOURCE]', b64encode(compress(file.read().encode())).decode('utf-8'))
+    with open(join(STATIC_DIR, 'require.js'), 'r', encoding='utf-8') as file:
+        content = content.replace('[REQUIRE_JS]', file.read())
+    with open(join(STATIC_DIR, 'fflate.js'), 'r', encoding='utf-8') as file:
+        content = content.replace('[FFLATE_JS]', file.read())
+    with open(join(STATIC_DIR, 'simexporter.js'), 'r', encoding='utf-8') as file:
+        content = content.replace('[SIMEXPORTER_JS]', file.read())
+    return content.replace('[ADDITIONAL]', '')
+
+
+def split_template(content: str) -> List[Union[bytes, str]]:
+    """
+    Split the template at its placeholders.
+
+    :param content: Content of the template.
+    """
+
+    parts = split(r'\[(' + '|'.join(PLACEHOLDERS) + r')\]', content)
+    # Even indices are literal parts, odd indices are placeholders names
+    return [part.encode('utf-8') if i % 2 == 0 else part for i, part in enumerate(parts)]
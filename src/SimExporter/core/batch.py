@@ -0,0 +1,123 @@
+from typing import List, Union, Optional, Callable, Dict, Any, TYPE_CHECKING
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from time import perf_counter
+from os import cpu_count
+
+from SimExporter.core.writer import write_snapshot
+from SimExporter.core.assets import get_template, set_template
+
+# The workers only write snapshots, they do not need to import k3d
+if TYPE_CHECKING:
+    from SimExporter.core.exporter import Exporter
+
+
+def export_batch(scenes: List[Union['Exporter', Callable[[], 'Exporter']]],
+                 filenames: List[str],
+                 workers: Optional[int] = None,
+                 background_color: Union[str, List] = 'white',
+                 grid_visible: bool = True,
+                 menu_visible: bool = True,
+                 frame_visible: bool = True,
+                 compression_level: int = 9,
+                 compression_strategy: str = 'default',
+                 compression_workers: int = 1,
+                 sidecar_frames: Optional[int] = None,
+                 cache_dir: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    Export several scenes in standalone HTML files in parallel, using a pool of processes.
+
+    :param scenes: Scenes to export, either Exporter instances (serialized in the main process) or picklable functions
+                   that build and return an Exporter (called in the worker processes).
+    :param filenames: Name of the HTML file of each scene.
+    :param workers: Number of processes. By default, the number of CPUs is used.
+    :param background_color: Color of the background in the 3D view.
+    :param grid_visible: If True, the reference grid is displayed.
+    :param menu_visible: If True, the menu panel is displayed.
+    :param frame_visible: If True, the reference frame is displayed.
+    :param compression_level: Compression level of the data, from 0 (no compression) to 9 (best compression).
+    :param compression_strategy: Compression strategy of the data, either 'default', 'filtered', 'huffman', 'rle' or
+                                 'fixed'.
+    :param compression_workers: Number of threads of each process to compress the data, see Exporter.to_html.
+    :param sidecar_frames: If provided, the frames of the animation are written in binary sidecar files with this
+                           number of frames per file, see Exporter.to_html.
+    :param cache_dir: If provided, the HTML template is cached on disk in this directory.
+    :return: The report of each export as {'filename': str, 'size': bytes, 'time': seconds}, in the order of scenes (the
+             filename is the path of the written HTML file, with the '.html' extension).
+    """
+
+    if len(scenes) != len(filenames):
+        raise ValueError(f'The number of scenes ({len(scenes)}) and filenames ({len(filenames)}) must be the same.')
+
+    display = {'background_color': background_color, 'grid_visible': grid_visible, 'menu_visible': menu_visible,
+               'frame_visible': frame_visible}
+    options = {'compression_level': compression_level, 'compression_strategy': compression_strategy,
+               'compression_workers': compression_workers, 'sidecar_frames': sidecar_frames}
+
+    # The template is built once and shared with the workers
+    template = get_template(cache_dir=cache_dir)
+
+    workers = cpu_count() if workers is None else workers
+    reports: List[Optional[Dict[str, Any]]] = [None] * len(scenes)
+    with ProcessPoolExecutor(max_workers=workers, initializer=set_template, initargs=(template,)) as pool:
+
+        # Limit the number of serialized scenes waiting for a worker
+        max_pending = 2 * workers
+        pending = {}
+        for i, (scene, filename) in enumerate(zip(scenes, filenames)):
+            if len(pending) >= max_pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    reports[pending.pop(future)] = future.result()
+
+            # Exporter instances are serialized in the main process, builders are sent to the workers
+            if not callable(scene):
+                start = perf_counter()
+                scene = _to_picklable(scene.get_snapshot(**display))
+                future = pool.submit(_export, scene, filename, display, options, perf_counter() - start)
+            else:
+                future = pool.submit(_export, scene, filename, display, options, 0.)
+            pending[future] = i
+
+        for future in pending:
+            reports[pending[future]] = future.result()
+
+    return reports
+
+
+def _export(scene: Union[Dict[str, Any], Callable[[], 'Exporter']],
+            filename: str,
+            display: Dict[str, Any],
+            options: Dict[str, Any],
+            elapsed: float) -> Dict[str, Any]:
+    """
+    Export a scene in a worker process.
+
+    :param scene: Either the snapshot of the scene or a function that builds the Exporter of the scene.
+    :param filename: Name of the HTML file.
+    :param display: Display options of the scene.
+    :param options: Export options of the scene.
+    :param elapsed: Time already spent to serialize the scene in the main process.
+    """
+
+    start = perf_counter()
+    if not isinstance(scene, dict):
+        scene = scene().get_snapshot(**display)
+    filename = f'{filename}.html' if not filename.endswith('.html') else filename
+    size = write_snapshot(snapshot=scene, filename=filename, **options)
+    return {'filename': filename, 'size': size, 'time': elapsed + perf_counter() - start}
+
+
+def _to_picklable(obj: Any) -> Any:
+    """
+    Convert the memory views of a snapshot to bytes so that it can be sent to another process.
+
+    :param obj: Snapshot or part of a snapshot.
+    """
+
+    if isinstance(obj, dict):
+        return {key: _to_picklable(value) for key, value in obj.items()}
+    elif isinstance(obj, list):
+        return [_to_picklable(value) for value in obj]
+    elif isinstance(obj, memoryview):
+        return obj.tobytes()
+    return obj
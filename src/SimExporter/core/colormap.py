@@ -0,0 +1,29 @@
+from typing import Dict, Tuple
+from numpy import ndarray, empty, arange, floor, float32
+
+
+# Color maps already built, by name and resolution
+_COLORMAPS: Dict[Tuple[str, int], ndarray] = {}
+
+
+def get_colormap(name: str, resolution: int = 256) -> ndarray:
+    """
+    Get the k3d color map array with values [i/n, R, G, B] of a color map scheme. The array is built once per name and
+    resolution, then shared (read-only).
+
+    :param name: Color map scheme name, see
+                 https://matplotlib.org/stable/users/explain/colors/colormaps.html#classes-of-colormaps.
+    :param resolution: Number of colors in the color map.
+    """
+
+    key = (name, resolution)
+    if key not in _COLORMAPS:
+        # vedo is only imported when a new color map is built
+        from vedo.colors import color_map
+        # Same colors as the lookup table of a vedo color map (VTK stores the colors as 8 bits values)
+        colormap = empty((resolution, 4), dtype=float32)
+        colormap[:, 0] = arange(resolution) / (resolution - 1)
+        colormap[:, 1:] = floor(color_map(range(resolution), name, 0, resolution) * 255 + 0.5) / 255
+        colormap.flags.writeable = False
+        _COLORMAPS[key] = colormap
+    return _COLORMAPS[key]
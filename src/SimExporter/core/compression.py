@@ -0,0 +1,124 @@
+from typing import Iterable, Iterator, Union
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from zlib import compressobj, compress, adler32, DEFLATED, MAX_WBITS, DEF_MEM_LEVEL, Z_SYNC_FLUSH, \
+    Z_DEFAULT_STRATEGY, Z_FILTERED, Z_HUFFMAN_ONLY, Z_RLE, Z_FIXED
+from struct import pack
+
+
+# Available compression strategies
+STRATEGIES = {'default': Z_DEFAULT_STRATEGY,
+              'filtered': Z_FILTERED,
+              'huffman': Z_HUFFMAN_ONLY,
+              'rle': Z_RLE,
+              'fixed': Z_FIXED}
+
+# Size of the window used as a dictionary between the independent blocks
+WINDOW_SIZE = 1 << 15
+
+
+def iter_deflate(pieces: Iterable[Union[bytes, memoryview]],
+                 level: int = 9,
+                 strategy: str = 'default',
+                 workers: int = 1,
+                 block_size: int = 1 << 20) -> Iterator[bytes]:
+    """
+    Compress a stream of pieces into a single zlib stream, chunk by chunk.
+
+    :param pieces: Data to compress.
+    :param level: Compression level (0 to 9).
+    :param strategy: Compression strategy, see STRATEGIES.
+    :param workers: Number of threads compressing independent blocks. If 1, the data is compressed sequentially.
+    :param block_size: Size of the blocks compressed in parallel in bytes.
+    """
+
+    if strategy not in STRATEGIES:
+        raise ValueError(f'Unknown compression strategy "{strategy}", available strategies are {list(STRATEGIES)}.')
+
+    # Parallel compression
+    if workers > 1:
+        yield from _iter_parallel_deflate(pieces=pieces, level=level, strategy=STRATEGIES[strategy], workers=workers,
+                                          block_size=block_size)
+        return
+
+    # Sequential compression
+    compressor = compressobj(level, DEFLATED, MAX_WBITS, DEF_MEM_LEVEL, STRATEGIES[strategy])
+    for piece in pieces:
+        out = compressor.compress(piece)
+        if len(out) > 0:
+            yield out
+    yield compressor.flush()
+
+
+def _iter_parallel_deflate(pieces: Iterable[Union[bytes, memoryview]],
+                           level: int,
+                           strategy: int,
+                           workers: int,
+                           block_size: int) -> Iterator[bytes]:
+    """
+    Compress a stream of pieces into a single zlib stream with several threads (zlib releases the GIL). Each block is
+    compressed as a raw deflate stream ending on a byte boundary and primed with the end of the previous block, so
+    that the concatenation of the blocks is a single valid deflate stream.
+
+    :param pieces: Data to compress.
+    :param level: Compression level (0 to 9).
+    :param strategy: Compression strategy.
+    :param workers: Number of threads.
+    :param block_size: Size of the blocks in bytes.
+    """
+
+    # zlib header (same as the sequential stream for this level)
+    yield compress(b'', level)[:2]
+
+    checksum = 1
+    previous = b''
+    pending = deque()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for block in _iter_blocks(pieces, block_size):
+            checksum = adler32(block, checksum)
+            pending.append(pool.submit(_deflate_block, block, previous, level, strategy))
+            previous = block[-WINDOW_SIZE:]
+            # Limit the number of blocks in memory, the compressed blocks are written in order
+            if len(pending) >= 2 * workers:
+                yield pending.popleft().result()
+        while len(pending) > 0:
+            yield pending.popleft().result()
+
+    # Empty final block and adler32 trailer
+    yield compressobj(level, DEFLATED, -MAX_WBITS).flush()
+    yield pack('>I', checksum)
+
+
+def _iter_blocks(pieces: Iterable[Union[bytes, memoryview]], block_size: int) -> Iterator[bytes]:
+    """
+    Gather a stream of pieces into blocks of a fixed size (except the last one).
+
+    :param pieces: Data to split.
+    :param block_size: Size of the blocks in bytes.
+    """
+
+    block = bytearray()
+    for piece in pieces:
+        block += piece
+        while len(block) >= block_size:
+            yield bytes(block[:block_size])
+            del block[:block_size]
+    if len(block) > 0:
+        yield bytes(block)
+
+
+def _deflate_block(block: bytes, previous: bytes, level: int, strategy: int) -> bytes:
+    """
+    Compress a block as a raw deflate stream, not terminated.
+
+    :param block: Data to compress.
+    :param previous: End of the previous block used as a dictionary.
+    :param level: Compression level (0 to 9).
+    :param strategy: Compression strategy.
+    """
+
+    if len(previous) > 0:
+        compressor = compressobj(level, DEFLATED, -MAX_WBITS, DEF_MEM_LEVEL, strategy, previous)
+    else:
+        compressor = compressobj(level, DEFLATED, -MAX_WBITS, DEF_MEM_LEVEL, strategy)
+    return compressor.compress(block) + compressor.flush(Z_SYNC_FLUSH)
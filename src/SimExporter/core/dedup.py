@@ -0,0 +1,83 @@
+from typing import Dict, Any, List, Iterator, Tuple
+from collections import Counter
+from hashlib import blake2b
+
+
+# Number of bytes compared at the start, at the end and along the buffers before hashing them
+SAMPLE_SIZE = 64
+
+
+def deduplicate(snapshot: Dict[str, Any], min_size: int = 1024) -> Dict[str, Any]:
+    """
+    Store the identical binary buffers of a snapshot only once. The duplicated buffers are moved in the 'buffers' list
+    of the snapshot and each 'key': buffer entry is replaced with a 'key_ref': index entry. The snapshot is not
+    modified, the objects with references are copies.
+
+    :param snapshot: Scene snapshot.
+    :param min_size: Minimal size in bytes of the buffers to deduplicate.
+    :return: The deduplicated snapshot, or the same snapshot if there is no duplicated buffer.
+    """
+
+    # Only the buffers with the same size and the same sampled bytes as another buffer can be duplicates (the frames
+    # of a time series have the same size), hash these ones
+    samples = {id(buffer): _sample(buffer) for buffer in _iter_buffers(snapshot['objects'], min_size)}
+    sample_counts = Counter(samples.values())
+    candidates = [buffer for buffer in _iter_buffers(snapshot['objects'], min_size)
+                  if sample_counts[samples[id(buffer)]] > 1]
+    digests = {id(buffer): blake2b(buffer, digest_size=16).digest() for buffer in candidates}
+    counts = Counter(digests[id(buffer)] for buffer in candidates)
+    if len(counts) == 0 or max(counts.values()) < 2:
+        return snapshot
+
+    # Replace the duplicated buffers with references to the shared copy
+    indices: Dict[bytes, int] = {}
+    buffers: List[memoryview] = []
+
+    def replace(obj: Any) -> Any:
+        if isinstance(obj, dict):
+            replaced = {}
+            for key, value in obj.items():
+                digest = digests.get(id(value))
+                if digest is not None and counts[digest] > 1:
+                    if digest not in indices:
+                        indices[digest] = len(buffers)
+                        buffers.append(value)
+                    replaced[f'{key}_ref'] = indices[digest]
+                else:
+                    replaced[key] = replace(value)
+            return replaced
+        elif isinstance(obj, list):
+            return [replace(value) for value in obj]
+        return obj
+
+    return {**snapshot, 'objects': replace(snapshot['objects']), 'buffers': buffers}
+
+
+def _sample(buffer: memoryview) -> Tuple[int, bytes]:
+    """
+    Get a cheap fingerprint of a buffer: its size, its first and last bytes and bytes sampled along the buffer.
+
+    :param buffer: Binary buffer.
+    """
+
+    view = memoryview(buffer).cast('B')
+    stride = max(1, len(view) // SAMPLE_SIZE)
+    return len(view), view[:SAMPLE_SIZE].tobytes() + view[-SAMPLE_SIZE:].tobytes() + view[::stride].tobytes()
+
+
+def _iter_buffers(obj: Any, min_size: int) -> Iterator[memoryview]:
+    """
+    Iterate over the binary buffers of a snapshot (flat byte views).
+
+    :param obj: Snapshot or part of a snapshot.
+    :param min_size: Minimal size in bytes of the buffers.
+    """
+
+    if isinstance(obj, dict):
+        for value in obj.values():
+            yield from _iter_buffers(value, min_size)
+    elif isinstance(obj, list):
+        for value in obj:
+            yield from _iter_buffers(value, min_size)
+    elif isinstance(obj, (bytes, bytearray, memoryview)) and memoryview(obj).nbytes >= min_size:
+        yield obj
@@ -1,30 +1,56 @@
-from typing import List, Union
-from os import makedirs
-from os.path import join, dirname, exists
-from k3d import Plot
-from base64 import b64encode
-from zlib import compress
-from msgpack import packb
-
+from typing import List, Union, Optional, Dict, Any, TYPE_CHECKING
+from itertools import count
+from numpy import ndarray, array, stack, dstack, eye, frombuffer, repeat, float32
 from SimExporter.core.factory import Factory, convert_color
+from SimExporter.core.snapshot import get_snapshot, array_to_json
+from SimExporter.core.quantization import quantize_snapshot
+from SimExporter.core.pruning import prune_snapshot
+from SimExporter.core.scene import save_scene, load_scene, get_bounds
+from SimExporter.core.writer import write_snapshot
+
+if TYPE_CHECKING:
+    from k3d import Plot
+
+
+# Identifiers of the objects that are not created by k3d (loaded from scene files, recorded in checkpoints)
+OBJECT_IDS = count(1)
 
 
 class Exporter:
 
-    def __init__(self, animation: bool = False, fps: float = 25.):
+    def __init__(self, animation: bool = False, fps: float = 25., keyframe_tolerance: Optional[float] = None):
         """
         Main API to create a scene with 3D objects and export a standalone 3D plot or animation in an HTML file.
 
         :param animation: If False, a static 3D plot is exported. If True, a 3D animation is exported if time series
                           are associated to a 3D object.
         :param fps: Frame rate of the animation (not used if animation = False).
+        :param keyframe_tolerance: If provided, the frames of the time series that are rebuilt by linear interpolation
+                                   of the kept frames with an absolute error lower than this tolerance are dropped (can
+                                   be overridden for each object).
         """
 
-        # Create a plotter to render the 3D objects
-        self._plt = Plot(fps=fps, camera_rotate_speed=5.)
+        # The plotter to render the 3D objects is created on first use (k3d loads VTK when it is imported)
+        self.__fps = fps
+        self.__plt: Optional['Plot'] = None
 
         # Create a factory to easily add 3D objects in the scene
-        self.objects = Factory(plt=self._plt, animation=animation)
+        self.objects = Factory(plt=lambda: self._plt, animation=animation, keyframe_tolerance=keyframe_tolerance)
+
+        # Objects and bounds of the scenes loaded from files
+        self.__loaded_objects: List[Dict[str, Any]] = []
+        self.__loaded_bounds: List[ndarray] = []
+
+    @property
+    def _plt(self) -> 'Plot':
+        """
+        Get the plotter that renders the 3D objects, created on first access.
+        """
+
+        if self.__plt is None:
+            from k3d import Plot
+            self.__plt = Plot(fps=self.__fps, camera_rotate_speed=5.)
+        return self.__plt
 
     def set_camera(self,
                    factor: float = 1.,
@@ -38,18 +64,116 @@ class Exporter:
         :param pitch: Pitch to apply on the objects.
         """
 
-        self._plt.camera = self._plt.get_auto_camera(factor=factor, yaw=yaw, pitch=pitch)
+        self._plt.camera = self._plt.get_auto_camera(factor=factor, yaw=yaw, pitch=pitch, bounds=self.__get_bounds())
+
+    def save(self, filename: str) -> None:
+        """
+        Save the current scene in a binary file. The scene can then be loaded with the 'load' method to be exported
+        again or combined with other scenes, without processing the geometries again.
+
+        :param filename: Name of the scene file.
+        """
+
+        snapshot = self.get_snapshot()
+        snapshot['bounds'] = get_bounds(snapshot['objects'])
+        save_scene(filename=filename, snapshot=snapshot)
+
+    def load(self, filename: str, offset: Optional[Union[ndarray, List[float]]] = None) -> None:
+        """
+        Add the objects of a scene saved with the 'save' method to the current scene. The binary data of the objects are
+        memory-mapped, not read. If the camera is not defined yet, the camera of the saved scene is used.
+
+        :param filename: Name of the scene file.
+        :param offset: If provided, the objects of the scene are translated by this [x, y, z] offset (only their model
+                       matrix is changed), so that several scenes can be displayed side by side.
+        """
+
+        snapshot = load_scene(filename=filename)
+
+        # Give new identifiers to the objects so that a scene can be loaded several times
+        for obj in snapshot['objects']:
+            obj['id'] = next(OBJECT_IDS)
+
+        # Translate the objects with their model matrix
+        if offset is not None:
+            translation = eye(4, dtype=float32)
+            translation[:3, 3] = offset
+            for obj in snapshot['objects']:
+                if isinstance(obj.get('model_matrix'), dict) and 'data' in obj['model_matrix']:
+                    matrix = frombuffer(obj['model_matrix']['data'], dtype=obj['model_matrix']['dtype']).reshape(4, 4)
+                    obj['model_matrix'] = array_to_json(translation @ matrix)
+            if snapshot['bounds'] is not None:
+                snapshot['bounds'] = array(snapshot['bounds']) + repeat(offset, 2)
+
+        self.__loaded_objects += snapshot['objects']
+        if snapshot['bounds'] is not None:
+            self.__loaded_bounds.append(array(snapshot['bounds']))
+
+        # Use the camera of the saved scene
+        if len(self._plt.camera) == 0:
+            self._plt.camera = snapshot['plot']['camera']
+
+    def __get_bounds(self) -> Optional[ndarray]:
+        """
+        Get the bounds of the scene, including the loaded scenes. If there is no loaded scene, the bounds are computed
+        by k3d.
+        """
+
+        if len(self.__loaded_bounds) == 0:
+            return None
+        bounds = self.__loaded_bounds + ([self._plt.get_auto_grid()] if len(self._plt.objects) > 0 else [])
+        bounds = stack(bounds)
+        return dstack([bounds[:, 0::2].min(axis=0), bounds[:, 1::2].max(axis=0)]).flatten()
 
     def to_html(self,
                 filename: str,
                 background_color: Union[str, List] = 'white',
                 grid_visible: bool = True,
                 menu_visible: bool = True,
-                frame_visible: bool = True) -> None:
+                frame_visible: bool = True,
+                compression_level: int = 9,
+                compression_strategy: str = 'default',
+                compression_workers: int = 1,
+                sidecar_frames: Optional[int] = None,
+                cache_dir: Optional[str] = None) -> None:
         """
         Export the current scene in a standalone HTML file.
 
         :param filename: Name of the HTML file.
+        :param background_color: Color of the background in the 3D view.
+        :param grid_visible: If True, the reference grid is displayed.
+        :param menu_visible: If True, the menu panel is displayed.
+        :param frame_visible: If True, the reference frame is displayed.
+        :param compression_level: Compression level of the data, from 0 (no compression) to 9 (best compression).
+        :param compression_strategy: Compression strategy of the data, either 'default', 'filtered', 'huffman', 'rle'
+                                     or 'fixed'.
+        :param compression_workers: Number of threads to compress the data. If greater than 1, independent chunks of
+                                    data are compressed in parallel.
+        :param sidecar_frames: If provided, only the first and last frames of the animation are embedded in the HTML
+                               file, the other frames are written in binary sidecar files next to the HTML file (with
+                               this number of frames per file) and fetched on demand by the browser. The HTML file must
+                               then be served with its sidecar files by an HTTP server.
+        :param cache_dir: If provided, the HTML template is cached on disk in this directory to be shared between
+                          processes.
+        """
+
+        # Get the scene snapshot
+        snapshot = self.get_snapshot(background_color=background_color, grid_visible=grid_visible,
+                                     menu_visible=menu_visible, frame_visible=frame_visible)
+
+        # Write the HTML file
+        write_snapshot(snapshot=snapshot, filename=filename, compression_level=compression_level,
+                       compression_strategy=compression_strategy, compression_workers=compression_workers,
+                       sidecar_frames=sidecar_frames, cache_dir=cache_dir)
+
+    def get_snapshot(self,
+                     background_color: Union[str, List] = 'white',
+                     grid_visible: bool = True,
+                     menu_visible: bool = True,
+                     frame_visible: bool = True) -> Dict[str, Any]:
+        """
+        Get the snapshot of the current scene, containing the serialized objects and the plot parameters.
+
         :param background_color: Color of the background in the 3D view.
         :param grid_visible: If True, the reference grid is displayed.
         :param menu_visible: If True, the menu panel is displayed.
@@ -59,20 +183,10 @@ class Exporter:
         # Set the background color
         self._plt.background_color = convert_color(background_color)
 
-        # Get the directory that contains the javascript files and fill the standalone snapshot
-        static_dir = join(dirname(dirname(__file__)), 'static')
-        with open(join(static_dir, 'snapshot_standalone.txt'), 'r', encoding='utf-8') as file:
-            content = file.read()
-        with open(join(static_dir, 'standalone.js'), 'r', encoding='utf-8') as file:
-            content = content.replace('[K3D_SOURCE]', b64encode(compress(file.read().encode())).decode('utf-8'))
-        with open(join(static_dir, 'require.js'), 'r', encoding='utf-8') as file:
-            content = content.replace('[REQUIRE_JS]', file.read())
-        with open(join(static_dir, 'fflate.js'), 'r', encoding='utf-8') as file:
-            content = content.replace('[FFLATE_JS]', file.read())
-        content = content.replace('[ADDITIONAL]', '')
-
-        # Get the scene snapshot
-        snapshot = self._plt.get_binary_snapshot_objects()
+        # Get the scene snapshot with the pruned meshes and the quantized time series, including the loaded scenes
+        snapshot = quantize_snapshot(snapshot=prune_snapshot(get_snapshot(self._plt)),
+                                     errors=self.objects.get_quantization())
+        snapshot['objects'] += self.__loaded_objects
 
         # Update the plot parameters with the options
         plot_params = self._plt.get_plot_params()
@@ -81,13 +195,5 @@ class Exporter:
         plot_params['axesHelper'] = 1. if frame_visible else 0.
         snapshot['plot'] = plot_params
 
-        # Compress data and fill the standalone snapshot
-        data = compress(packb(snapshot, use_bin_type=True), 9)
-        content = content.replace('[DATA]', b64encode(data).decode('utf-8'))
+        return snapshot
 
-        # Write in the HTML file
-        filename = f'{filename}.html' if not filename.endswith('.html') else filename
-        if dirname(filename) != '' and not exists(dirname(filename)):
-            makedirs(dirname(filename))
-        with open(filename, 'w', encoding='utf-8') as file:
-            file.write(content)
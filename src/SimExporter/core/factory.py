@@ -1,22 +1,46 @@
-from typing import Optional, List, Union
-from numpy import ndarray, float32
-from k3d import Plot
-from colour import Color
+from typing import Optional, List, Union, Dict, Tuple, Callable, TYPE_CHECKING
+from functools import lru_cache
+from tempfile import TemporaryFile
+from numpy import ndarray, memmap, asarray, zeros, repeat, float32, uint32
 
 from SimExporter.core import objects as obj
+from SimExporter.core.keyframes import get_keyframes
+from SimExporter.core.geometry import decimate, boundary_faces, compact_vertices
 
+if TYPE_CHECKING:
+    from k3d import Plot
 
-def convert_color(color: Union[str, List]) -> int:
+
+# Rounding offset of the colour package when converting RGB values to hex values
+_FLOAT_ERROR = 0.0000005
+
+
+def convert_color(color: Union[str, List, Tuple]) -> int:
     """
-    Convert a color input into its hex value.
+    Convert a color input into its hex value. The conversions are memoized.
 
     :param color: A string with the color name or a list with [R, G, B] values.
     """
 
+    # Lists are not hashable, use tuples as cache keys
+    return _convert_color(color if isinstance(color, str) else tuple(color))
+
+
+@lru_cache(maxsize=1024)
+def _convert_color(color: Union[str, Tuple]) -> int:
+    """
+    Convert a color name or a tuple of (R, G, B) values into its hex value.
+
+    :param color: A string with the color name or a tuple with (R, G, B) values.
+    """
+
+    # Imported on first use to keep the package import light
+    from colour import Color
+
     kwargs = {}
 
     # Case 1: RGB values
-    if isinstance(color, list):
+    if isinstance(color, tuple):
         if max(color) > 1:
             color = [c / 255 for c in color]
         kwargs['rgb'] = color
@@ -29,20 +53,96 @@ def convert_color(color: Union[str, List]) -> int:
     return int(Color(**kwargs).get_hex_l().replace('#', '0x'), 16)
 
 
+def convert_colors(colors: Union[ndarray, List]) -> ndarray:
+    """
+    Convert an array of colors into an array of hex values (packed as 0xRRGGBB in uint32).
+
+    :param colors: Either an array of [R, G, B] values with shape (..., 3), a list of color names and/or [R, G, B]
+                   values, or an uint32 array of hex values (returned as is).
+    """
+
+    # Lists with color names, possibly mixed with [R, G, B] values: convert each color
+    if isinstance(colors, (list, tuple)) and any(isinstance(color, str) for color in colors):
+        return asarray([convert_color(color) for color in colors], dtype=uint32)
+    colors = asarray(colors)
+
+    # Already hex values
+    if colors.dtype == uint32:
+        return colors
+
+    # Color names: convert each different name once
+    if colors.dtype.kind in 'UO':
+        return asarray([convert_color(c) for c in colors.ravel()], dtype=uint32).reshape(colors.shape)
+
+    # RGB values: convert the whole array at once with the same rounding as a single color
+    scale = 255. if colors.max() > 1 else 1.
+    hex_values = zeros(colors.shape[:-1], dtype=uint32)
+    for i, shift in enumerate((16, 8, 0)):
+        channel = (colors[..., i] / scale * 255 + 0.5 - _FLOAT_ERROR).clip(0, 255).astype(uint32)
+        hex_values |= channel << uint32(shift)
+    return hex_values
+
+
+def to_float32(frames: ndarray, scale: float = 1.) -> ndarray:
+    """
+    Convert a time series array to float32 without copying it if possible. Memory-mapped arrays are converted frame by
+    frame in a temporary memory-mapped file so that they are never fully loaded in memory.
+
+    :param frames: Time series array, the first dimension being the time.
+    :param scale: Scale to apply on the values.
+    """
+
+    # Already float32: no copy
+    if frames.dtype == float32 and scale == 1.:
+        return frames
+
+    # Memory-mapped array: convert each frame in a temporary file (deleted when the result is garbage collected)
+    if isinstance(frames, memmap):
+        with TemporaryFile() as file:
+            converted = memmap(file, dtype=float32, mode='w+', shape=frames.shape)
+        for i in range(len(frames)):
+            converted[i] = frames[i] * scale
+        return converted
+
+    # In-memory array: a single conversion
+    frames = frames.astype(float32, copy=False)
+    return frames * float32(scale) if scale != 1. else frames
+
+
+def get_time_key(index: int, frame_times: Optional[ndarray] = None) -> str:
+    """
+    Get the key of a frame in a k3d time series.
+
+    :param index: Index of the frame.
+    :param frame_times: Time of each frame (the frame indices are used if None).
+    """
+
+    return str(index) if frame_times is None else str(round(float(frame_times[index]), 6))
+
+
 class Factory:
 
-    def __init__(self, plt: Plot, animation: bool):
+    def __init__(self,
+                 plt: Union['Plot', Callable[[], 'Plot']],
+                 animation: bool,
+                 keyframe_tolerance: Optional[float] = None):
         """
         API to create k3d objects.
 
-        :param plt: k3d plotter used to render the objects.
+        :param plt: k3d plotter used to render the objects, or a function that returns it (so that the plotter is only
+                    created when an object is added).
         :param animation: If True, existing time series are associated to the 3D objects.
+        :param keyframe_tolerance: Default keyframe tolerance of the time series, see Factory.add_mesh.
         """
 
         self.__animation = animation
+        self.__keyframe_tolerance = keyframe_tolerance
+
+        # Getter of the plotter to render the 3D objects (k3d plotters are not callable)
+        self.__plt = plt if callable(plt) else lambda: plt
 
-        # The plotter to render the 3D objects
-        self.__plt = plt
+        # Error bounds of the quantized time series, by object id and field name
+        self.__quantization: Dict[int, Dict[str, float]] = {}
 
     def add_mesh(self,
                  positions: ndarray,
@@ -55,7 +155,15 @@ class Factory:
                  colormap_range: Optional[List[int]] = None,
                  colormap_values: Optional[ndarray] = None,
                  time_positions: Optional[ndarray] = None,
-                 time_colormap_values: Optional[ndarray] = None) -> None:
+                 time_colormap_values: Optional[ndarray] = None,
+                 quantization_error: Optional[float] = None,
+                 keyframe_tolerance: Optional[float] = None,
+                 triangle_budget: Optional[int] = None,
+                 colors: Optional[Union[ndarray, List]] = None,
+                 time_colors: Optional[ndarray] = None,
+                 boundary: bool = False,
+                 compact: bool = False,
+                 frame_times: Optional[ndarray] = None) -> None:
         """
         Create a new Mesh object.
 
@@ -71,8 +179,52 @@ class Factory:
         :param colormap_values: Scalar values to color the mesh regarding the color map.
         :param time_positions: Time series array for the positions.
         :param time_colormap_values: Time series array for the color map scalar values.
+        :param quantization_error: If provided, the frames of the time series are quantized with 8 or 16 bits integers
+                                   so that the absolute error on each value is lower than this bound.
+        :param keyframe_tolerance: If provided, the frames of the time series that are rebuilt by linear interpolation
+                                   of the kept frames with an absolute error lower than this tolerance are dropped. By
+                                   default, the tolerance of the Exporter is used.
+        :param triangle_budget: If provided, the mesh is decimated once to have at most this number of triangles. The
+                                kept vertices are a subset of the original ones so that the time series are reduced
+                                without remeshing each frame.
+        :param colors: Colors of each vertex, either an array of [R, G, B] values or a list of 'color names' and/or
+                       [R, G, B] values. The color map values are used instead if provided.
+        :param time_colors: Time series array for the colors of each vertex.
+        :param boundary: If True, the cells are tetrahedra or hexahedra (VTK vertex ordering) and only the boundary
+                         faces of the volume are exported.
+        :param compact: If True, only the vertices used by the cells are kept (including in the time series). With
+                        'boundary', only the vertices of the boundary faces are kept.
+        :param frame_times: Time of each frame of the time series, in number of frames (by default, the frames are
+                            evenly spaced).
         """
 
+        # Keep the boundary faces of the volume cells, and optionally only the vertices of the exported cells
+        vertex_map = None
+        if boundary:
+            cells = boundary_faces(positions=positions, cells=cells)
+        if compact:
+            cells, vertex_map = compact_vertices(cells=cells)
+            positions = positions[vertex_map]
+
+        # Decimate the mesh
+        if triangle_budget is not None:
+            cells, decimation_map = decimate(positions=positions, cells=cells, triangle_budget=triangle_budget)
+            positions = positions[decimation_map]
+            vertex_map = decimation_map if vertex_map is None else vertex_map[decimation_map]
+
+        # Keep the values of the remaining vertices
+        if vertex_map is not None:
+            if colormap_values is not None:
+                colormap_values = colormap_values[vertex_map]
+            if time_positions is not None:
+                time_positions = time_positions[:, vertex_map]
+            if time_colormap_values is not None:
+                time_colormap_values = time_colormap_values[:, vertex_map]
+            if colors is not None:
+                colors = convert_colors(colors)[vertex_map]
+            if time_colors is not None:
+                time_colors = time_colors[:, vertex_map]
+
         # Create the mesh
         mesh = obj.mesh(positions=positions,
                         cells=cells,
@@ -83,17 +235,25 @@ class Factory:
                         colormap_name=colormap_name,
                         colormap_range=colormap_range,
                         colormap_values=colormap_values,
-                        time_colormaps=time_colormap_values)
+                        time_colormaps=time_colormap_values,
+                        colors=self.__get_colors(colors, time_colors))
 
-        # Add to the plotter
-        self.__plt += mesh
+        # Add to the plotter (the object is exported, not displayed as a widget: closing its comm avoids serializing
+        # a copy of the time series each time they are assigned)
+        self.__add(mesh)
+        mesh.close()
 
         # Associate time series if animation
         if self.__animation:
             if time_positions is not None:
-                mesh.vertices = {str(i): t for i, t in enumerate(time_positions.astype(float32))}
+                mesh.vertices = self.__get_time_series(time_positions, keyframe_tolerance, frame_times)
             if time_colormap_values is not None:
-                mesh.attribute = {str(i): t for i, t in enumerate(time_colormap_values.astype(float32))}
+                mesh.attribute = self.__get_time_series(time_colormap_values, keyframe_tolerance, frame_times)
+            if time_colors is not None:
+                mesh.colors = self.__get_color_series(time_colors, frame_times)
+            # Quantize the time series at export
+            if quantization_error is not None:
+                self.__quantization[mesh.id] = {name: quantization_error for name in ('vertices', 'attribute')}
 
     def add_points(self,
                    positions: ndarray,
@@ -104,7 +264,12 @@ class Factory:
                    colormap_range: Optional[List[int]] = None,
                    colormap_values: Optional[ndarray] = None,
                    time_positions: Optional[ndarray] = None,
-                   time_colormap_values: Optional[ndarray] = None) -> None:
+                   time_colormap_values: Optional[ndarray] = None,
+                   quantization_error: Optional[float] = None,
+                   keyframe_tolerance: Optional[float] = None,
+                   colors: Optional[Union[ndarray, List]] = None,
+                   time_colors: Optional[ndarray] = None,
+                   frame_times: Optional[ndarray] = None) -> None:
         """
         Create a new Points object.
 
@@ -118,6 +283,16 @@ class Factory:
         :param colormap_values: Scalar values to color the points regarding the color map.
         :param time_positions: Times series array for the positions.
         :param time_colormap_values: Time series array for the color map scalar values.
+        :param quantization_error: If provided, the frames of the time series are quantized with 8 or 16 bits integers
+                                   so that the absolute error on each value is lower than this bound.
+        :param keyframe_tolerance: If provided, the frames of the time series that are rebuilt by linear interpolation
+                                   of the kept frames with an absolute error lower than this tolerance are dropped. By
+                                   default, the tolerance of the Exporter is used.
+        :param colors: Colors of each point, either an array of [R, G, B] values or a list of 'color names' and/or
+                       [R, G, B] values. The color map values are used instead if provided.
+        :param time_colors: Time series array for the colors of each point.
+        :param frame_times: Time of each frame of the time series, in number of frames (by default, the frames are
+                            evenly spaced).
         """
 
         # Create the points
@@ -128,17 +303,25 @@ class Factory:
                             colormap_name=colormap_name,
                             colormap_range=colormap_range,
                             colormap_values=colormap_values,
-                            time_colormaps=time_colormap_values)
+                            time_colormaps=time_colormap_values,
+                            colors=self.__get_colors(colors, time_colors))
 
-        # Add to the plotter
-        self.__plt += points
+        # Add to the plotter (the object is exported, not displayed as a widget: closing its comm avoids serializing
+        # a copy of the time series each time they are assigned)
+        self.__add(points)
+        points.close()
 
         # Associate time series if animation
         if self.__animation:
             if time_positions is not None:
-                points.positions = {str(i): t for i, t in enumerate(time_positions.astype(float32))}
+                points.positions = self.__get_time_series(time_positions, keyframe_tolerance, frame_times)
             if time_colormap_values is not None:
-                points.attribute = {str(i): t for i, t in enumerate(time_colormap_values.astype(float32))}
+                points.attribute = self.__get_time_series(time_colormap_values, keyframe_tolerance, frame_times)
+            if time_colors is not None:
+                points.colors = self.__get_color_series(time_colors, frame_times)
+            # Quantize the time series at export
+            if quantization_error is not None:
+                self.__quantization[points.id] = {name: quantization_error for name in ('positions', 'attribute')}
 
     def add_arrows(self,
                    positions: ndarray,
@@ -148,7 +331,12 @@ class Factory:
                    head_size: float = 1.,
                    line_width: float = 0.02,
                    time_positions: Optional[ndarray] = None,
-                   time_vectors: Optional[ndarray] = None) -> None:
+                   time_vectors: Optional[ndarray] = None,
+                   quantization_error: Optional[float] = None,
+                   keyframe_tolerance: Optional[float] = None,
+                   colors: Optional[Union[ndarray, List]] = None,
+                   time_colors: Optional[ndarray] = None,
+                   frame_times: Optional[ndarray] = None) -> None:
         """
         Create a new Vectors object.
 
@@ -160,6 +348,16 @@ class Factory:
         :param line_width: Width of the vectors.
         :param time_positions: Time series array for the positions.
         :param time_vectors: Time series array for the vectors values.
+        :param quantization_error: If provided, the frames of the time series are quantized with 8 or 16 bits integers
+                                   so that the absolute error on each value is lower than this bound.
+        :param keyframe_tolerance: If provided, the frames of the time series that are rebuilt by linear interpolation
+                                   of the kept frames with an absolute error lower than this tolerance are dropped. By
+                                   default, the tolerance of the Exporter is used.
+        :param colors: Colors of each vector, either an array of [R, G, B] values or a list of 'color names' and/or
+                       [R, G, B] values.
+        :param time_colors: Time series array for the colors of each vector.
+        :param frame_times: Time of each frame of the time series, in number of frames (by default, the frames are
+                            evenly spaced).
         """
 
         # Create the vectors
@@ -167,17 +365,85 @@ class Factory:
                              vecs=vectors.astype(float32) * scale,
                              color=convert_color(color),
                              head_size=max(head_size, 1e-6),
-                             line_width=line_width)
+                             line_width=line_width,
+                             colors=self.__get_colors(colors, time_colors))
 
-        # Add to the plotter
-        self.__plt += arrows
+        # Add to the plotter (the object is exported, not displayed as a widget: closing its comm avoids serializing
+        # a copy of the time series each time they are assigned)
+        self.__add(arrows)
+        arrows.close()
 
         # Associate time series if animation
         if self.__animation:
             if time_positions is not None:
-                arrows.origins = {str(i): t for i, t in enumerate(time_positions.astype(float32))}
+                arrows.origins = self.__get_time_series(time_positions, keyframe_tolerance, frame_times)
             if time_vectors is not None:
-                arrows.vectors = {str(i): t for i, t in enumerate(time_vectors.astype(float32) * scale)}
+                arrows.vectors = self.__get_time_series(time_vectors, keyframe_tolerance, frame_times, scale=scale)
+            if time_colors is not None:
+                # Both the origin and the head of each vector have a color
+                arrows.colors = {key: repeat(c, 2)
+                                 for key, c in self.__get_color_series(time_colors, frame_times).items()}
+            # Quantize the time series at export
+            if quantization_error is not None:
+                self.__quantization[arrows.id] = {name: quantization_error for name in ('origins', 'vectors')}
+
+    def __get_time_series(self,
+                          frames: ndarray,
+                          keyframe_tolerance: Optional[float],
+                          frame_times: Optional[ndarray],
+                          scale: float = 1.) -> Dict[str, ndarray]:
+        """
+        Create the k3d time series of an array, keeping only the keyframes if a tolerance is defined. The keys are the
+        times (or the indices) of the frames so that the kept frames keep their time value. The frames are views on
+        the array (or on its float32 conversion), they are not copied.
+
+        :param frames: Time series array.
+        :param keyframe_tolerance: Keyframe tolerance of the object (the default tolerance is used if None).
+        :param frame_times: Time of each frame (the frame indices are used if None).
+        :param scale: Scale to apply on the values.
+        """
+
+        frames = to_float32(frames=frames, scale=scale)
+        tolerance = self.__keyframe_tolerance if keyframe_tolerance is None else keyframe_tolerance
+        keys = range(len(frames)) if tolerance is None else get_keyframes(frames=frames, tolerance=tolerance,
+                                                                          times=frame_times)
+        # Plain array views so that the memory-mapped frames are not copied by the k3d traits
+        return {get_time_key(i, frame_times): asarray(frames[i]) for i in keys}
+
+    @staticmethod
+    def __get_colors(colors: Optional[Union[ndarray, List]], time_colors: Optional[ndarray]) -> Optional[ndarray]:
+        """
+        Get the hex values of the colors of an object, or of the first frame of the colors time series if no colors
+        are provided.
+
+        :param colors: Colors of each vertex.
+        :param time_colors: Time series array for the colors of each vertex.
+        """
+
+        if colors is None and time_colors is not None:
+            colors = time_colors[0]
+        return convert_colors(colors) if colors is not None else None
+
+    @staticmethod
+    def __get_color_series(time_colors: ndarray, frame_times: Optional[ndarray]) -> Dict[str, ndarray]:
+        """
+        Create the k3d time series of a colors array. All the frames are kept as the colors are interpolated by channel
+        in the player.
+
+        :param time_colors: Time series array for the colors of each vertex.
+        :param frame_times: Time of each frame (the frame indices are used if None).
+        """
+
+        # Convert all the frames at once
+        time_colors = convert_colors(time_colors)
+        return {get_time_key(i, frame_times): time_colors[i] for i in range(len(time_colors))}
+
+    def get_quantization(self) -> Dict[int, Dict[str, float]]:
+        """
+        Get the error bounds of the time series to quantize, by object id and field name.
+        """
+
+        return self.__quantization
 
     def add_k3d_objects(self, *objs) -> None:
         """
@@ -188,4 +454,14 @@ class Factory:
 
         # Add each k3d object to the plotter
         for o in objs:
-            self.__plt += o
+            self.__add(o)
+
+    def __add(self, obj) -> None:
+        """
+        Add a k3d object to the plotter.
+
+        :param obj: k3d object.
+        """
+
+        plt = self.__plt()
+        plt += obj
@@ -0,0 +1,227 @@
+from typing import Tuple, List, Union
+from numpy import ndarray, asarray, arange, stack, floor, unique, lexsort, flatnonzero, diff, bincount, concatenate, \
+    sort, zeros, full, cross, einsum, where, split, cumsum, int64
+
+
+# Maximal number of grid cells along each dimension for the vertex clustering
+MAX_RESOLUTION = 1 << 20
+
+# Faces of the volume cells (VTK vertex ordering), oriented outward for positively oriented cells
+TETRA_FACES = [[0, 2, 1], [0, 1, 3], [1, 2, 3], [0, 3, 2]]
+HEXA_FACES = [[0, 3, 2, 1], [4, 5, 6, 7], [0, 1, 5, 4], [1, 2, 6, 5], [2, 3, 7, 6], [3, 0, 4, 7]]
+
+
+def triangulate(cells: Union[ndarray, List[List[int]]]) -> ndarray:
+    """
+    Split polygonal cells in triangles (fan triangulation).
+
+    :param cells: Cells of the surface, either an array of shape (n_cells, n_vertices_per_cell) or a list of cells with
+                  different numbers of vertices.
+    :return: The triangles as an array of shape (n_triangles, 3).
+    """
+
+    # Group the cells by number of vertices
+    if isinstance(cells, ndarray) and cells.ndim == 2:
+        groups = [cells]
+    else:
+        sizes = {}
+        for cell in cells:
+            sizes.setdefault(len(cell), []).append(cell)
+        groups = [asarray(group) for group in sizes.values()]
+
+    # Split each group of polygons in triangles
+    triangles = []
+    for group in groups:
+        if group.shape[1] == 3:
+            triangles.append(group)
+        elif group.shape[1] > 3:
+            triangles.append(stack([group[:, [0, i, i + 1]] for i in range(1, group.shape[1] - 1)],
+                                   axis=1).reshape(-1, 3))
+    return concatenate(triangles) if len(triangles) > 0 else zeros((0, 3), dtype=int64)
+
+
+def is_polygons(cells: Union[ndarray, List[List[int]]], n_vertices: int) -> bool:
+    """
+    Check if cells are polygons (at least 3 vertices) with valid vertex indices.
+
+    :param cells: Cells of the surface, either an array or a list of cells with different numbers of vertices.
+    :param n_vertices: Number of vertices of the surface.
+    """
+
+    if isinstance(cells, ndarray) and cells.ndim == 2:
+        indices = cells
+    else:
+        if len(cells) == 0 or min(len(cell) for cell in cells) < 3:
+            return False
+        indices = concatenate([asarray(cell) for cell in cells])
+    return indices.shape[-1] >= 3 and indices.dtype.kind in 'iu' and indices.size > 0 and \
+        0 <= indices.min() and indices.max() < n_vertices
+
+
+def boundary_faces(positions: ndarray, cells: Union[ndarray, List[List[int]]]) -> ndarray:
+    """
+    Extract the boundary surface of a volume mesh: the faces of the cells that are not shared with another cell.
+
+    :param positions: Positions of the vertices.
+    :param cells: Tetrahedra (4 vertices) or hexahedra (8 vertices) with the VTK vertex ordering.
+    :return: The boundary faces, triangles for tetrahedra and quads for hexahedra, oriented outward.
+    """
+
+    cells = asarray(cells)
+    if cells.ndim != 2 or cells.shape[1] not in (4, 8):
+        raise ValueError(f"Volume cells must be tetrahedra or hexahedra, got cells with shape {cells.shape}.")
+    positions = asarray(positions, dtype=float)
+
+    # Flip the negatively oriented cells (sign of the volume of the corner tetrahedron) so that all faces point outward
+    a, b, c, d = (positions[cells[:, i]] for i in ((0, 1, 2, 3) if cells.shape[1] == 4 else (0, 1, 3, 4)))
+    flipped = einsum('ij,ij->i', cross(b - a, c - a), d - a) < 0
+    if cells.shape[1] == 4:
+        cells = where(flipped[:, None], cells[:, [0, 2, 1, 3]], cells)
+        faces = cells[:, TETRA_FACES].reshape(-1, 3)
+    else:
+        cells = where(flipped[:, None], cells[:, [4, 5, 6, 7, 0, 1, 2, 3]], cells)
+        faces = cells[:, HEXA_FACES].reshape(-1, 4)
+
+    # The boundary faces are the faces that appear only once, identified by their sorted vertices
+    _, inverse, counts = _unique_rows(sort(faces, axis=1), n=len(positions))
+    return faces[counts[inverse] == 1]
+
+
+def compact_vertices(cells: Union[ndarray, List[List[int]]]) -> Tuple[Union[ndarray, List[ndarray]], ndarray]:
+    """
+    Remove the vertices that are not used by any cell.
+
+    :param cells: Cells of the surface, either an array of shape (n_cells, n_vertices_per_cell) or a list of cells with
+                  different numbers of vertices.
+    :return: The cells with the new vertex indices and the indices of the kept vertices in the original positions, so
+             that any per-vertex array 'a' of the original surface is 'a[..., vertex_map]' on the reduced surface.
+    """
+
+    if isinstance(cells, ndarray) and cells.ndim == 2:
+        vertex_map, inverse = unique(cells, return_inverse=True)
+        return inverse.reshape(cells.shape), vertex_map
+
+    # Cells with different numbers of vertices are remapped as a flat array
+    cells = [asarray(cell) for cell in cells]
+    vertex_map, inverse = unique(concatenate(cells), return_inverse=True)
+    return split(inverse.reshape(-1), cumsum([len(cell) for cell in cells])[:-1]), vertex_map
+
+
+def select_cells(cells: Union[ndarray, List[List[int]]], indices: ndarray,
+                 n_vertices: int) -> Union[ndarray, List[ndarray]]:
+    """
+    Restrict cells to a subset of vertices: the cells with a vertex outside the subset are removed and the vertex
+    indices of the other cells are remapped to the positions of the vertices in the subset.
+
+    :param cells: Cells, either an array of shape (n_cells, n_vertices_per_cell) or a list of cells with different
+                  numbers of vertices.
+    :param indices: Indices of the kept vertices, the vertex 'indices[i]' becomes the vertex 'i'.
+    :param n_vertices: Number of vertices of the original cells.
+    """
+
+    # Lookup table from the original vertex indices to the subset, -1 for the removed vertices
+    lookup = full(n_vertices, -1, dtype=int64)
+    lookup[asarray(indices)] = arange(len(indices))
+
+    # Remap the cells and remove the cells that are not fully in the subset
+    if isinstance(cells, ndarray) and cells.ndim == 2:
+        cells = lookup[cells]
+        return cells[(cells >= 0).all(axis=1)]
+    cells = [lookup[asarray(cell)] for cell in cells]
+    return [cell for cell in cells if (cell >= 0).all()]
+
+
+def decimate(positions: ndarray,
+             cells: Union[ndarray, List[List[int]]],
+             triangle_budget: int) -> Tuple[ndarray, ndarray]:
+    """
+    Reduce the number of triangles of a surface under a budget with vertex clustering: the vertices are grouped in the
+    cells of a regular grid and each group is replaced by its vertex closest to the group center. The resolution of the
+    grid is the highest one that satisfies the budget.
+
+    :param positions: Positions of the vertices.
+    :param cells: Cells of the surface.
+    :param triangle_budget: Maximal number of triangles.
+    :return: The triangles of the reduced surface and the indices of the kept vertices in the original positions, so
+             that any per-vertex array 'a' of the original surface is 'a[..., vertex_map]' on the reduced surface.
+    """
+
+    positions = asarray(positions, dtype=float)
+    triangles = triangulate(cells)
+    if len(triangles) <= triangle_budget:
+        return triangles, arange(len(positions))
+
+    # Binary search on the number of grid cells along the largest dimension of the bounding box
+    low, high = 1, 2
+    while high < MAX_RESOLUTION and len(_collapse(triangles, _cluster(positions, high))) <= triangle_budget:
+        low, high = high, high * 2
+    while high - low > 1:
+        middle = (low + high) // 2
+        if len(_collapse(triangles, _cluster(positions, middle))) <= triangle_budget:
+            low = middle
+        else:
+            high = middle
+    clusters = _cluster(positions, low)
+
+    # Representative vertex of each cluster: the closest one to the cluster center
+    counts = bincount(clusters)
+    center = stack([bincount(clusters, weights=positions[:, i]) / counts for i in range(3)], axis=1)
+    distance = ((positions - center[clusters]) ** 2).sum(axis=1)
+    order = lexsort((distance, clusters))
+    vertex_map = order[concatenate([[0], flatnonzero(diff(clusters[order])) + 1])]
+
+    return _collapse(triangles, clusters), vertex_map
+
+
+def _cluster(positions: ndarray, resolution: int) -> ndarray:
+    """
+    Cluster the vertices on a regular grid.
+
+    :param positions: Positions of the vertices.
+    :param resolution: Number of grid cells along the largest dimension of the bounding box.
+    :return: The cluster index of each vertex.
+    """
+
+    origin = positions.min(axis=0)
+    size = max(float((positions.max(axis=0) - origin).max()), 1e-12) / resolution
+    coordinates = floor((positions - origin) / size).astype(int64).clip(0, resolution)
+    keys = coordinates[:, 0] + (resolution + 1) * (coordinates[:, 1] + (resolution + 1) * coordinates[:, 2])
+    return unique(keys, return_inverse=True)[1].reshape(-1)
+
+
+def _collapse(triangles: ndarray, clusters: ndarray) -> ndarray:
+    """
+    Replace the vertices of the triangles with their cluster, then remove the collapsed and the duplicated triangles.
+
+    :param triangles: Triangles of the surface.
+    :param clusters: Cluster index of each vertex.
+    """
+
+    triangles = clusters[triangles]
+    triangles = triangles[(triangles[:, 0] != triangles[:, 1]) & (triangles[:, 1] != triangles[:, 2]) &
+                          (triangles[:, 2] != triangles[:, 0])]
+
+    # Identify the triangles by their sorted vertices
+    first, _, _ = _unique_rows(sort(triangles, axis=1), n=int(clusters.max()) + 1)
+    return triangles[sort(first)]
+
+
+def _unique_rows(rows: ndarray, n: int) -> Tuple[ndarray, ndarray, ndarray]:
+    """
+    Find the unique rows of an array of vertex indices, with a single integer key per row if it cannot overflow.
+
+    :param rows: Array of vertex indices of shape (n_rows, k).
+    :param n: Number of vertices.
+    :return: The index of the first occurrence of each unique row, the index of the unique row of each row and the
+             number of occurrences of each unique row.
+    """
+
+    rows = rows.astype(int64)
+    if n ** rows.shape[1] < 1 << 63:
+        keys = zeros(len(rows), dtype=int64)
+        for i in range(rows.shape[1]):
+            keys = keys * n + rows[:, i]
+        _, first, inverse, counts = unique(keys, return_index=True, return_inverse=True, return_counts=True)
+    else:
+        _, first, inverse, counts = unique(rows, axis=0, return_index=True, return_inverse=True, return_counts=True)
+    return first, inverse.reshape(-1), counts
@@ -0,0 +1,44 @@
+from typing import List, Optional
+from numpy import ndarray, arange, asarray, full, maximum, minimum, inf, float64
+
+
+def get_keyframes(frames: ndarray, tolerance: float, times: Optional[ndarray] = None) -> List[int]:
+    """
+    Select the keyframes of a time series so that the other frames are rebuilt by linear interpolation between the
+    surrounding keyframes with an absolute error lower than the tolerance. The first and the last frames are always
+    kept.
+
+    :param frames: Time series array, the first dimension being the time.
+    :param tolerance: Absolute error tolerance on each value of the interpolated frames.
+    :param times: Time of each frame, the frames are evenly spaced by default.
+    :return: The sorted indices of the keyframes.
+    """
+
+    keyframes = [0]
+    n_frames = len(frames)
+    times = arange(n_frames, dtype=float64) if times is None else asarray(times, dtype=float64)
+    while keyframes[-1] < n_frames - 1:
+        start = keyframes[-1]
+        first = asarray(frames[start], dtype=float64)
+
+        # Extend the segment from the last keyframe while the interpolation of the inner frames is accurate enough.
+        # Each inner frame bounds the slope of each value between the keyframes: the bounds are updated once per frame
+        # instead of interpolating the whole segment again for each new end.
+        end = start + 1
+        low, high = full(first.shape, -inf), full(first.shape, inf)
+        while end + 1 < n_frames:
+
+            # The current end becomes an inner frame of the segment
+            duration = times[end] - times[start]
+            delta = asarray(frames[end], dtype=float64) - first
+            low = maximum(low, (delta - tolerance) / duration)
+            high = minimum(high, (delta + tolerance) / duration)
+
+            # The next frame is a valid end if its slope satisfies the bounds of all the inner frames
+            slope = (asarray(frames[end + 1], dtype=float64) - first) / (times[end + 1] - times[start])
+            if not ((low <= slope) & (slope <= high)).all():
+                break
+            end += 1
+        keyframes.append(end)
+
+    return keyframes
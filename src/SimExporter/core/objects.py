@@ -1,9 +1,12 @@
-from typing import Optional, List
-from numpy import ndarray, array, float32, zeros_like
-import k3d
-from k3d.helpers import array_serialization_wrap
-from k3d.transform import process_transform_arguments
-from vedo import Mesh, Points
+from typing import Optional, List, TYPE_CHECKING
+from numpy import ndarray, asarray, repeat, float32, uint32, zeros_like
+
+from SimExporter.core.colormap import get_colormap
+from SimExporter.core.geometry import triangulate, is_polygons
+
+# k3d is imported when the first object is created (it loads VTK when it is imported)
+if TYPE_CHECKING:
+    import k3d
 
 
 def mesh(positions: ndarray,
@@ -15,7 +18,8 @@ def mesh(positions: ndarray,
          colormap_name: str,
          colormap_range: Optional[List[int]],
          colormap_values: Optional[ndarray],
-         time_colormaps: Optional[ndarray]) -> k3d.objects.Mesh:
+         time_colormaps: Optional[ndarray],
+         colors: Optional[ndarray]) -> 'k3d.objects.Mesh':
     """
     Create a new Mesh object.
 
@@ -29,47 +33,65 @@ def mesh(positions: ndarray,
     :param colormap_range: Color map range.
     :param colormap_values: Color map scalar values.
     :param time_colormaps: Time series array for the color map scalar values.
+    :param colors: Hex values of the colors of each vertex.
     """
 
-    # Create a temporary Vedo mesh to get vtkPolyData as k3d.Mesh objects only accept triangle cells
-    poly_mesh = Mesh(inputobj=[positions, cells])
+    import k3d
 
     # Get the first value of the time series if the color map array is empty
     if time_colormaps is not None and colormap_values is None:
         colormap_values = time_colormaps[0]
 
     # Define color map variables
-    color_map, color_attribute = None, None
+    color_map, color_range = None, []
     if colormap_values is not None:
-        # Add the color map to the vedo mesh
-        poly_mesh.cmap(input_cmap=colormap_name, input_array=colormap_values, name='scalars')
-        # Get the created lookup table
-        lut = poly_mesh.mapper.GetLookupTable()
-        n_color = lut.GetTable().GetNumberOfTuples()
-        # Build the color map array with values [i/n, R, G, B]
-        color_map = []
-        for i in range(n_color):
-            color_map.append([i / (n_color - 1)] + list(lut.GetTableValue(i))[:3])
-        color_map = array(color_map, dtype=float32)
-        # Define the color map attribute as ['array_name', v_min, v_max]
-        color_attribute = ['scalars']
-        # Add the color map range to the attributes
+        # Get the color map array with values [i/n, R, G, B]
+        color_map = get_colormap(name=colormap_name)
+        # Define the color map range
         if colormap_range is not None:
-            color_attribute += colormap_range
+            color_range = colormap_range
         else:
             if time_colormaps is not None:
-                color_attribute += [time_colormaps.min(), time_colormaps.max()]
+                color_range = [float(time_colormaps.min()), float(time_colormaps.max())]
             else:
-                color_attribute += [colormap_values.min(), colormap_values.max()]
+                color_range = [float(colormap_values.min()), float(colormap_values.max())]
+
+    # Polygonal cells are split in triangles with NumPy
+    if is_polygons(cells=cells, n_vertices=len(positions)):
+        return k3d.mesh(vertices=asarray(positions, dtype=float32),
+                        indices=triangulate(cells).astype(uint32),
+                        color=color,
+                        opacity=opacity,
+                        wireframe=wireframe,
+                        flat_shading=flat_shading,
+                        color_map=color_map,
+                        attribute=colormap_values if colormap_values is not None else [],
+                        color_range=color_range,
+                        colors=colors if colors is not None else [])
+
+    # Otherwise, create a temporary Vedo mesh to get vtkPolyData as k3d.Mesh objects only accept triangle cells (vedo is
+    # only imported if this fallback is used)
+    from vedo import Mesh
+    poly_mesh = Mesh(inputobj=[positions, cells])
+    color_attribute = None
+    if colormap_values is not None:
+        # Add the scalar values to the vedo mesh, the color map attribute is ['array_name', v_min, v_max]
+        poly_mesh.pointdata['scalars'] = colormap_values
+        color_attribute = ['scalars'] + list(color_range)
 
     # Actually create the k3d mesh
-    return k3d.vtk_poly_data(poly_data=poly_mesh.dataset,
-                             color=color,
-                             opacity=opacity,
-                             wireframe=wireframe,
-                             flat_shading=flat_shading,
-                             color_map=color_map,
-                             color_attribute=color_attribute)
+    k3d_mesh = k3d.vtk_poly_data(poly_data=poly_mesh.dataset,
+                                 color=color,
+                                 opacity=opacity,
+                                 wireframe=wireframe,
+                                 flat_shading=flat_shading,
+                                 color_map=color_map,
+                                 color_attribute=color_attribute)
+
+    # The vertices of the vedo mesh are in the same order, the colors of each vertex are kept
+    if colors is not None:
+        k3d_mesh.colors = colors
+    return k3d_mesh
 
 
 def points(positions: ndarray,
@@ -79,7 +101,8 @@ def points(positions: ndarray,
            colormap_name: str,
            colormap_range: Optional[List[int]],
            colormap_values: Optional[ndarray],
-           time_colormaps: Optional[ndarray]) -> k3d.objects.Points:
+           time_colormaps: Optional[ndarray],
+           colors: Optional[ndarray]) -> 'k3d.objects.Points':
     """
     Create a new Points object.
 
@@ -91,8 +114,11 @@ def points(positions: ndarray,
     :param colormap_range: Color map range.
     :param colormap_values: Color map scalar values.
     :param time_colormaps: Time series array for the color map scalar values.
+    :param colors: Hex values of the colors of each point.
     """
 
+    import k3d
+
     # Get the first value of the time series if the color map array is empty
     if time_colormaps is not None and colormap_values is None:
         colormap_values = time_colormaps[0]
@@ -100,16 +126,8 @@ def points(positions: ndarray,
     # Define color map variables
     color_map, color_attribute, color_range = None, [], []
     if colormap_values is not None:
-        # Create a temporary Vedo points to create the color map
-        pcd = Points(inputobj=positions).cmap(input_cmap=colormap_name, input_array=colormap_values)
-        # Get the created lookup table
-        lut = pcd.mapper.GetLookupTable()
-        n_color = lut.GetTable().GetNumberOfTuples()
-        # Build the color map array with values [i/n, R, G, B]
-        color_map = []
-        for i in range(n_color):
-            color_map.append([i / (n_color - 1)] + list(lut.GetTableValue(i))[:3])
-        color_map = array(color_map, dtype=float32)
+        # Get the color map array with values [i/n, R, G, B]
+        color_map = get_colormap(name=colormap_name)
         # Define the color map attribute
         color_attribute = colormap_values
         # Define the color map range
@@ -117,9 +135,9 @@ def points(positions: ndarray,
             color_range = colormap_range
         else:
             if time_colormaps is not None:
-                color_range += [time_colormaps.min(), time_colormaps.max()]
+                color_range += [float(time_colormaps.min()), float(time_colormaps.max())]
             else:
-                color_range += [colormap_values.min(), colormap_values.max()]
+                color_range += [float(colormap_values.min()), float(colormap_values.max())]
 
     # Actually create the k3d points
     return k3d.points(positions=positions,
@@ -129,14 +147,16 @@ def points(positions: ndarray,
                       shader='3D',
                       color_map=color_map,
                       attribute=color_attribute,
-                      color_range=color_range)
+                      color_range=color_range,
+                      colors=colors if colors is not None else [])
 
 
 def vectors(origins,
             vecs,
             color,
             head_size,
-            line_width) -> k3d.objects.Vectors:
+            line_width,
+            colors) -> 'k3d.objects.Vectors':
     """
     Create a new Vectors object.
 
@@ -145,18 +165,24 @@ def vectors(origins,
     :param color: Color of the vectors.
     :param head_size: Size of the head of the vectors.
     :param line_width: Width of the vectors.
+    :param colors: Hex values of the colors of each vector.
     """
 
+    import k3d
+    from k3d.helpers import array_serialization_wrap
+    from k3d.transform import process_transform_arguments
+
     TimeSeries, Array = k3d.objects.TimeSeries, k3d.objects.Array
 
     class Vectors(k3d.objects.Vectors):
         origins = TimeSeries(Array(dtype=float32)).tag(sync=True, **array_serialization_wrap('origins'))
         vectors = TimeSeries(Array(dtype=float32)).tag(sync=True, **array_serialization_wrap('vectors'))
+        colors = TimeSeries(Array(dtype=uint32)).tag(sync=True, **array_serialization_wrap('colors'))
 
     return process_transform_arguments(
         Vectors(vectors=vecs if vecs is not None else origins,
                 origins=origins if vecs is not None else zeros_like(vecs),
-                colors=[],
+                colors=repeat(colors, 2) if colors is not None else [],
                 origin_color=color,
                 head_color=color,
                 use_head=True,
@@ -0,0 +1,106 @@
+from typing import Dict, Any, Optional
+from numpy import ndarray, frombuffer, unique, uint16, uint32
+
+from SimExporter.core.snapshot import array_to_json
+from SimExporter.core.sidecar import is_time_series
+
+
+# Fields of the k3d meshes with a value for each vertex
+VERTEX_FIELDS = ['vertices', 'attribute', 'colors', 'normals', 'uvs']
+
+
+def prune_snapshot(snapshot: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Remove the vertices that are not used by any triangle in the meshes of a snapshot, and store the indices as uint16
+    values when the number of vertices allows it. The snapshot is not modified, the pruned objects are copies.
+
+    :param snapshot: Scene snapshot.
+    """
+
+    return {**snapshot, 'objects': [prune_mesh(obj) or obj for obj in snapshot['objects']]}
+
+
+def prune_mesh(obj: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    Remove the unused vertices of a serialized mesh and narrow its indices. The same compaction is applied to each
+    per-vertex field (positions, color map values, colors, normals, uvs) and to each frame of their time series.
+
+    :param obj: Serialized k3d object.
+    :return: The pruned mesh, or None if the object is not a mesh with static indices or if there is nothing to
+             prune.
+    """
+
+    if obj.get('type') != 'Mesh' or not _is_array(obj.get('indices')):
+        return None
+
+    # Number of vertices, the same in each frame of the time series
+    vertices = obj.get('vertices')
+    frames = list(vertices.values()) if is_time_series(vertices) else [vertices]
+    if not _is_array(frames[0]):
+        return None
+    n_vertices = _shape(frames[0])[0]
+    indices = _to_array(obj['indices'])
+    if len(indices) == 0 or not all(_is_vertex_array(frame, n_vertices) for frame in frames):
+        return None
+
+    # Find the used vertices, nothing to do if they are all used and if the indices cannot be narrowed
+    used, new_indices = unique(indices, return_inverse=True)
+    pruned = len(used) < n_vertices
+    dtype = uint16 if len(used) <= 1 << 16 else uint32
+    if not pruned and indices.dtype == dtype:
+        return None
+
+    # Remap the indices
+    obj = dict(obj)
+    obj['indices'] = array_to_json(new_indices.reshape(indices.shape).astype(dtype))
+
+    # Keep the values of the used vertices in each per-vertex field and in each frame of their time series
+    if pruned:
+        for name in VERTEX_FIELDS:
+            value = obj.get(name)
+            if is_time_series(value) and all(_is_vertex_array(frame, n_vertices) for frame in value.values()):
+                obj[name] = {key: array_to_json(_to_array(frame)[used]) for key, frame in value.items()}
+            elif _is_vertex_array(value, n_vertices):
+                obj[name] = array_to_json(_to_array(value)[used])
+    return obj
+
+
+def _is_array(value: Any) -> bool:
+    """
+    Check if a serialized trait value is a (non quantized) array.
+
+    :param value: Serialized trait value.
+    """
+
+    return isinstance(value, dict) and 'data' in value and 'shape' in value
+
+
+def _is_vertex_array(value: Any, n_vertices: int) -> bool:
+    """
+    Check if a serialized trait value is an array with a value for each vertex.
+
+    :param value: Serialized trait value.
+    :param n_vertices: Number of vertices.
+    """
+
+    return _is_array(value) and len(_shape(value)) > 0 and _shape(value)[0] == n_vertices
+
+
+def _shape(value: Dict[str, Any]) -> tuple:
+    """
+    Get the shape of a serialized array.
+
+    :param value: Serialized array.
+    """
+
+    return tuple(value['shape'])
+
+
+def _to_array(value: Dict[str, Any]) -> ndarray:
+    """
+    Get a view on the values of a serialized array.
+
+    :param value: Serialized array.
+    """
+
+    return frombuffer(value['data'], dtype=value['dtype']).reshape(_shape(value))
@@ -0,0 +1,70 @@
+from typing import Dict, Any, Optional
+from numpy import ndarray, frombuffer, finfo, float32, float64, uint8, int16, rint
+
+from SimExporter.core.sidecar import is_time_series
+
+
+def quantize_snapshot(snapshot: Dict[str, Any], errors: Dict[int, Dict[str, float]]) -> Dict[str, Any]:
+    """
+    Quantize the frames of the time series of a snapshot. The snapshot is not modified, the quantized objects are
+    copies.
+
+    :param snapshot: Scene snapshot.
+    :param errors: Absolute error bound of the quantized time series, by object id and field name.
+    """
+
+    objects = []
+    for obj in snapshot['objects']:
+        if obj['id'] in errors:
+            obj = dict(obj)
+            for name, error in errors[obj['id']].items():
+                if is_time_series(obj.get(name)):
+                    obj[name] = {key: quantize_array(frame, error) or frame for key, frame in obj[name].items()}
+        objects.append(obj)
+    return {**snapshot, 'objects': objects}
+
+
+def quantize_array(array: Dict[str, Any], error: float) -> Optional[Dict[str, Any]]:
+    """
+    Quantize a serialized float32 array as uint8 or int16 values with a scale and an offset, so that each value is
+    restored as 'offset + scale * q' with an absolute error lower than the error bound.
+
+    :param array: Serialized array.
+    :param error: Absolute error bound.
+    :return: The serialized quantized array, or None if the error bound cannot be satisfied with 16 bits.
+    """
+
+    if array['dtype'] != 'float32' or 'data' not in array:
+        return None
+    values = frombuffer(array['data'], dtype=float32).astype(float64)
+    if len(values) == 0:
+        return None
+    v_min, v_max = values.min(), values.max()
+
+    # The maximal error of the rounding is half the scale (plus the float32 rounding of the restored values), use the
+    # smallest integer type that satisfies the bound
+    rounding = finfo(float32).eps * max(abs(v_min), abs(v_max))
+    for dtype, q_min, q_max in ((uint8, 0, 255), (int16, -32767, 32767)):
+        scale = (v_max - v_min) / (q_max - q_min)
+        if scale / 2 + rounding <= error:
+            scale = scale if scale > 0 else 1.
+            offset = v_min - q_min * scale
+            quantized = rint((values - offset) / scale).clip(q_min, q_max).astype(dtype)
+            return {'dtype': 'float32',
+                    'shape': array['shape'],
+                    'quantized_data': memoryview(quantized),
+                    'quantized_dtype': quantized.dtype.name,
+                    'scale': float(scale),
+                    'offset': float(offset)}
+    return None
+
+
+def dequantize_array(array: Dict[str, Any]) -> ndarray:
+    """
+    Restore the float32 values of a serialized quantized array.
+
+    :param array: Serialized quantized array.
+    """
+
+    quantized = frombuffer(array['quantized_data'], dtype=array['quantized_dtype'])
+    return (array['offset'] + array['scale'] * quantized.astype(float64)).astype(float32)
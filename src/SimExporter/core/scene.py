@@ -0,0 +1,130 @@
+from typing import Dict, Any, List, Tuple, Union, Optional
+from os import makedirs
+from os.path import dirname, exists
+from struct import pack, unpack
+from mmap import mmap, ACCESS_READ
+from msgpack import packb, unpackb, ExtType
+from numpy import frombuffer, array
+
+from SimExporter.core.quantization import dequantize_array
+
+
+# Header of the scene files
+MAGIC = b'SIMEXPORTER\x00'
+VERSION = 1
+
+# Binary buffers are aligned in the file so that they can be viewed as typed arrays
+ALIGNMENT = 64
+
+# msgpack extension type of the references to the binary buffers
+BUFFER_EXT = 1
+
+
+def save_scene(filename: str, snapshot: Dict[str, Any]) -> None:
+    """
+    Save a scene snapshot in a binary file. The structure of the snapshot is stored in a msgpack header, the binary
+    buffers are stored as is after the header (aligned) so that they can be memory-mapped when loading the scene.
+
+    :param filename: Name of the scene file.
+    :param snapshot: Scene snapshot, see Exporter.get_snapshot.
+    """
+
+    # Replace the binary buffers with references to their location in the file
+    buffers: List[Tuple[int, memoryview]] = []
+    header = packb({'version': VERSION, 'snapshot': _extract_buffers(snapshot, buffers)}, use_bin_type=True)
+
+    if dirname(filename) != '' and not exists(dirname(filename)):
+        makedirs(dirname(filename))
+    with open(filename, 'wb') as file:
+        file.write(MAGIC)
+        file.write(pack('<Q', len(header)))
+        file.write(header)
+        # Each buffer starts on an aligned position
+        for _, buffer in buffers:
+            file.write(b'\x00' * (_align(file.tell()) - file.tell()))
+            file.write(buffer)
+
+
+def load_scene(filename: str) -> Dict[str, Any]:
+    """
+    Load a scene snapshot from a binary file. The binary buffers are memory-mapped, not read.
+
+    :param filename: Name of the scene file.
+    """
+
+    with open(filename, 'rb') as file:
+        if file.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f'The file "{filename}" is not a SimExporter scene file.')
+        header_size = unpack('<Q', file.read(8))[0]
+        header = file.read(header_size)
+        data = memoryview(mmap(file.fileno(), 0, access=ACCESS_READ))
+
+    # Restore the binary buffers as views on the memory-mapped file
+    start = _align(len(MAGIC) + 8 + header_size)
+
+    def ext_hook(code: int, ref: bytes) -> Union[memoryview, ExtType]:
+        if code == BUFFER_EXT:
+            offset, size = unpack('<QQ', ref)
+            return data[start + offset:start + offset + size]
+        return ExtType(code, ref)
+
+    content = unpackb(header, raw=False, strict_map_key=False, use_list=True, ext_hook=ext_hook)
+    if content['version'] > VERSION:
+        raise ValueError(f'The scene file "{filename}" was saved with a newer version of SimExporter.')
+    return content['snapshot']
+
+
+def get_bounds(objects: List[Dict[str, Any]]) -> Optional[List[float]]:
+    """
+    Compute the bounds [x_min, x_max, y_min, y_max, z_min, z_max] of serialized objects from their positions (first
+    frame for time series).
+
+    :param objects: Serialized objects of a snapshot.
+    """
+
+    bounds = []
+    for obj in objects:
+        for name in ('vertices', 'positions', 'origins'):
+            value = obj.get(name)
+            # Time series: get the first frame
+            if isinstance(value, dict) and 'shape' not in value and len(value) > 0:
+                value = value[min(value.keys(), key=float)]
+            if isinstance(value, dict) and 'quantized_data' in value:
+                value = {'data': dequantize_array(value), 'dtype': 'float32'}
+            if isinstance(value, dict) and 'data' in value and memoryview(value['data']).nbytes > 0:
+                positions = frombuffer(value['data'], dtype=value['dtype']).reshape(-1, 3)
+                bounds.append([positions.min(axis=0), positions.max(axis=0)])
+    if len(bounds) == 0:
+        return None
+    bounds = array(bounds)
+    return array([bounds[:, 0].min(axis=0), bounds[:, 1].max(axis=0)]).T.flatten().tolist()
+
+
+def _extract_buffers(obj: Any, buffers: List[Tuple[int, memoryview]]) -> Any:
+    """
+    Recursively replace the binary buffers of a snapshot with references to their location in the data section of
+    the file.
+
+    :param obj: Snapshot or part of a snapshot.
+    :param buffers: List of the extracted buffers.
+    """
+
+    if isinstance(obj, dict):
+        return {key: _extract_buffers(value, buffers) for key, value in obj.items()}
+    elif isinstance(obj, (list, tuple)):
+        return [_extract_buffers(value, buffers) for value in obj]
+    elif isinstance(obj, (bytes, bytearray, memoryview)):
+        offset = 0 if len(buffers) == 0 else _align(buffers[-1][0] + buffers[-1][1].nbytes)
+        buffers.append((offset, memoryview(obj).cast('B')))
+        return ExtType(BUFFER_EXT, pack('<QQ', offset, buffers[-1][1].nbytes))
+    return obj
+
+
+def _align(position: int) -> int:
+    """
+    Get the next aligned position in the file.
+
+    :param position: Current position in the file.
+    """
+
+    return position + (-position % ALIGNMENT)
@@ -0,0 +1,63 @@
+from typing import Dict, Any, List, Tuple
+
+
+def is_time_series(value: Any) -> bool:
+    """
+    Check if a serialized trait value is a time series of arrays.
+
+    :param value: Serialized trait value.
+    """
+
+    if not isinstance(value, dict) or len(value) == 0:
+        return False
+    for key, frame in value.items():
+        try:
+            float(key)
+        except ValueError:
+            return False
+        if not isinstance(frame, dict) or 'shape' not in frame:
+            return False
+    return True
+
+
+def split_time_series(snapshot: Dict[str, Any], frames_per_file: int) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+    """
+    Split the frames of the time series of a snapshot. The first and the last frames of each time series remain in the
+    snapshot so that the scene and the time range are available immediately, the other frames are grouped by time in
+    the sidecar chunks.
+
+    :param snapshot: Scene snapshot.
+    :param frames_per_file: Number of time values in each sidecar chunk.
+    :return: The reduced snapshot and the list of sidecar chunks as {'start': t0, 'end': t1, 'objects': [...]}.
+    """
+
+    # Get the frames to move in the sidecar chunks
+    objects, times = [], set()
+    for obj in snapshot['objects']:
+        reduced = dict(obj)
+        for name, value in obj.items():
+            if is_time_series(value) and len(value) > 2:
+                keys = sorted(value.keys(), key=float)
+                reduced[name] = {keys[0]: value[keys[0]], keys[-1]: value[keys[-1]]}
+                times.update(float(key) for key in keys[1:-1])
+        objects.append(reduced)
+    times = sorted(times)
+
+    # Group the frames by time range
+    chunks = []
+    for i in range(0, len(times), frames_per_file):
+        start, end = times[i], times[min(i + frames_per_file, len(times)) - 1]
+        chunk = {'start': start, 'end': end, 'objects': []}
+        for obj, reduced in zip(snapshot['objects'], objects):
+            frames = {}
+            for name, value in obj.items():
+                if reduced[name] is not value:
+                    series = {key: frame for key, frame in value.items()
+                              if start <= float(key) <= end and key not in reduced[name]}
+                    if len(series) > 0:
+                        frames[name] = series
+            if len(frames) > 0:
+                chunk['objects'].append({'id': obj['id'], **frames})
+        chunks.append(chunk)
+
+    return {**snapshot, 'objects': objects}, chunks
@@ -0,0 +1,140 @@
+from typing import Dict, Any, Iterator, Union, TYPE_CHECKING
+from struct import pack
+from numpy import ndarray, ascontiguousarray, float64, float32, int64, int32
+from msgpack import Packer
+
+if TYPE_CHECKING:
+    from k3d import Plot
+
+
+def array_to_json(ar: ndarray) -> Dict[str, Any]:
+    """
+    Serialize a numpy array as k3d does, but without copying the data when the array is already contiguous.
+
+    :param ar: A numpy array.
+    """
+
+    # WebGL does not support float64 and JS does not support int64
+    if ar.dtype == float64:
+        ar = ar.astype(float32)
+    elif ar.dtype == int64:
+        ar = ar.astype(int32)
+
+    # Get a flat view on the data (copied only if the array is not contiguous)
+    if not ar.flags['C_CONTIGUOUS']:
+        ar = ascontiguousarray(ar)
+    return {'data': memoryview(ar.reshape(-1)),
+            'dtype': str(ar.dtype),
+            'shape': ar.shape}
+
+
+def get_snapshot(plt: 'Plot') -> Dict[str, Any]:
+    """
+    Get the binary snapshot of the objects of a k3d plot. This is equivalent to 'Plot.get_binary_snapshot_objects'
+    except that the arrays and the time series of arrays are not copied.
+
+    :param plt: k3d plotter that renders the objects.
+    """
+
+    snapshot = {'objects': [], 'chunkList': []}
+    for o in plt.objects:
+        obj = {}
+        for k, v in o.traits().items():
+            if 'sync' in v.metadata:
+                value = v.get(o)
+                if 'to_json' in v.metadata:
+                    # Arrays and time series of arrays are serialized without copy (unless compressed by k3d)
+                    if getattr(o, 'compression_level', 0) <= 0 and _is_array(value):
+                        obj[k] = array_to_json(value)
+                    elif getattr(o, 'compression_level', 0) <= 0 and isinstance(value, dict) and len(value) > 0 \
+                            and all(_is_array(t) for t in value.values()):
+                        obj[k] = {str(t): array_to_json(a) for t, a in value.items()}
+                    else:
+                        obj[k] = v.metadata['to_json'](value, o)
+                else:
+                    obj[k] = value
+        snapshot['objects'].append(obj)
+    return snapshot
+
+
+def _is_array(value: Any) -> bool:
+    """
+    Check if a value is a numerical numpy array.
+
+    :param value: Any trait value.
+    """
+
+    return isinstance(value, ndarray) and value.dtype.kind in ['u', 'i', 'f']
+
+
+def iter_packb(obj: Any, chunk_size: int = 1 << 20) -> Iterator[Union[bytes, memoryview]]:
+    """
+    Serialize an object with msgpack piece by piece. The output is the same as 'msgpack.packb(obj, use_bin_type=True)'
+    but the binary buffers are never copied and the pieces are at most about the size of a chunk.
+
+    :param obj: Object to serialize.
+    :param chunk_size: Size of the pieces in bytes.
+    """
+
+    packer = Packer(use_bin_type=True)
+    pending = bytearray()
+    for piece in _iter_pack(obj, packer, chunk_size):
+        # Large buffers are sent as is, small pieces are gathered to avoid too many tiny pieces
+        if isinstance(piece, memoryview):
+            if len(pending) > 0:
+                yield bytes(pending)
+                pending.clear()
+            yield piece
+        else:
+            pending += piece
+            if len(pending) >= chunk_size:
+                yield bytes(pending)
+                pending.clear()
+    if len(pending) > 0:
+        yield bytes(pending)
+
+
+def _iter_pack(obj: Any, packer: Packer, chunk_size: int) -> Iterator[Union[bytes, memoryview]]:
+    """
+    Recursively serialize an object with msgpack.
+
+    :param obj: Object to serialize.
+    :param packer: msgpack packer.
+    :param chunk_size: Size of the pieces in bytes.
+    """
+
+    # Containers are serialized item by item
+    if isinstance(obj, dict):
+        yield packer.pack_map_header(len(obj))
+        for key, value in obj.items():
+            yield from _iter_pack(key, packer, chunk_size)
+            yield from _iter_pack(value, packer, chunk_size)
+
+    elif isinstance(obj, (list, tuple)):
+        yield packer.pack_array_header(len(obj))
+        for value in obj:
+            yield from _iter_pack(value, packer, chunk_size)
+
+    # Large binary buffers are sliced without copy
+    elif isinstance(obj, (bytes, bytearray, memoryview)) and memoryview(obj).nbytes > chunk_size:
+        buffer = memoryview(obj).cast('B')
+        yield _bin_header(buffer.nbytes)
+        for i in range(0, buffer.nbytes, chunk_size):
+            yield buffer[i:i + chunk_size]
+
+    else:
+        yield packer.pack(obj)
+
+
+def _bin_header(size: int) -> bytes:
+    """
+    Get the msgpack header of a binary buffer (bin 8, bin 16 or bin 32 format).
+
+    :param size: Size of the buffer in bytes.
+    """
+
+    if size < 1 << 8:
+        return pack('>BB', 0xc4, size)
+    elif size < 1 << 16:
+        return pack('>BH', 0xc5, size)
+    return pack('>BI', 0xc6, size)
@@ -0,0 +1,151 @@
+from typing import Dict, Iterable, Iterator, List, Tuple, Union, Optional, Any
+from os import makedirs
+from os.path import dirname, exists, basename
+from base64 import b64encode
+from json import dumps
+
+from SimExporter.core.assets import get_template
+from SimExporter.core.snapshot import iter_packb
+from SimExporter.core.compression import iter_deflate
+from SimExporter.core.sidecar import split_time_series
+from SimExporter.core.dedup import deduplicate
+
+
+def iter_b64encode(chunks: Iterable[bytes]) -> Iterator[bytes]:
+    """
+    Encode a stream of chunks in base64, chunk by chunk. The concatenation of the output is the same as the base64
+    encoding of the concatenated chunks.
+
+    :param chunks: Data to encode.
+    """
+
+    rest = b''
+    for chunk in chunks:
+        chunk = rest + chunk if len(rest) > 0 else chunk
+        # Only encode multiples of 3 bytes so that no padding is inserted in the middle of the stream
+        n = len(chunk) - len(chunk) % 3
+        if n > 0:
+            yield b64encode(chunk[:n])
+        rest = chunk[n:]
+    yield b64encode(rest)
+
+
+def write_html(filename: str,
+               template: List[Union[bytes, str]],
+               fields: Dict[str, Union[bytes, Iterable[bytes]]]) -> int:
+    """
+    Write an HTML file by streaming the fields in the template, without building the whole document in memory.
+
+    :param filename: Name of the HTML file.
+    :param template: Split template, alternating the literal parts (bytes) and the placeholders names (str).
+    :param fields: Content of each placeholder, either bytes or an iterable of bytes.
+    :return: Number of written bytes.
+    """
+
+    if dirname(filename) != '' and not exists(dirname(filename)):
+        makedirs(dirname(filename))
+
+    size = 0
+    with open(filename, 'wb') as file:
+        for part in template:
+            # Literal part of the template
+            if isinstance(part, bytes):
+                size += file.write(part)
+            # Placeholder to fill
+            else:
+                field = fields[part]
+                for chunk in ([field] if isinstance(field, bytes) else field):
+                    size += file.write(chunk)
+    return size
+
+
+def write_binary(filename: str, chunks: Iterable[bytes]) -> int:
+    """
+    Write a binary file by streaming the chunks.
+
+    :param filename: Name of the binary file.
+    :param chunks: Content of the file.
+    :return: Number of written bytes.
+    """
+
+    if dirname(filename) != '' and not exists(dirname(filename)):
+        makedirs(dirname(filename))
+
+    size = 0
+    with open(filename, 'wb') as file:
+        for chunk in chunks:
+            size += file.write(chunk)
+    return size
+
+
+def write_sidecar(filename: str,
+                  chunk: Dict[str, Any],
+                  compression_level: int = 9,
+                  compression_strategy: str = 'default',
+                  compression_workers: int = 1) -> Tuple[Dict[str, Any], int]:
+    """
+    Write a chunk of frames in a binary sidecar file.
+
+    :param filename: Name of the sidecar file.
+    :param chunk: Chunk of frames as {'start': t0, 'end': t1, 'objects': [...]}, see split_time_series.
+    :param compression_level: Compression level of the data, from 0 (no compression) to 9 (best compression).
+    :param compression_strategy: Compression strategy of the data, see write_snapshot.
+    :param compression_workers: Number of threads to compress the data.
+    :return: The description of the sidecar file listed in the HTML file and the number of written bytes.
+    """
+
+    size = write_binary(filename=filename,
+                        chunks=iter_deflate(iter_packb(deduplicate({'objects': chunk['objects']})),
+                                            level=compression_level, strategy=compression_strategy,
+                                            workers=compression_workers))
+    return {'url': basename(filename), 'start': chunk['start'], 'end': chunk['end']}, size
+
+
+def write_snapshot(snapshot: Dict[str, Any],
+                   filename: str,
+                   compression_level: int = 9,
+                   compression_strategy: str = 'default',
+                   compression_workers: int = 1,
+                   sidecar_frames: Optional[int] = None,
+                   cache_dir: Optional[str] = None,
+                   sidecars: Optional[List[Dict[str, Any]]] = None) -> int:
+    """
+    Write a scene snapshot in a standalone HTML file.
+
+    :param snapshot: Scene snapshot, see Exporter.get_snapshot.
+    :param filename: Name of the HTML file.
+    :param compression_level: Compression level of the data, from 0 (no compression) to 9 (best compression).
+    :param compression_strategy: Compression strategy of the data, either 'default', 'filtered', 'huffman', 'rle' or
+                                 'fixed'.
+    :param compression_workers: Number of threads to compress the data.
+    :param sidecar_frames: If provided, the frames of the animation are written in binary sidecar files with this
+                           number of frames per file.
+    :param cache_dir: If provided, the HTML template is cached on disk in this directory.
+    :param sidecars: Sidecar files already written with write_sidecar, listed in the HTML file.
+    :return: Number of written bytes (HTML and sidecar files).
+    """
+
+    # Get the standalone snapshot with the javascript sources (built once per process)
+    template = get_template(cache_dir=cache_dir)
+
+    filename = f'{filename}.html' if not filename.endswith('.html') else filename
+    compression = {'level': compression_level, 'strategy': compression_strategy, 'workers': compression_workers}
+    size = 0
+
+    # Write the frames of the animation in the sidecar files
+    sidecars = list(sidecars) if sidecars is not None else []
+    if sidecar_frames is not None:
+        snapshot, chunks = split_time_series(snapshot=snapshot, frames_per_file=sidecar_frames)
+        for chunk in chunks:
+            sidecar, sidecar_size = write_sidecar(filename=f'{filename[:-len(".html")]}.{len(sidecars)}.bin',
+                                                  chunk=chunk, compression_level=compression_level,
+                                                  compression_strategy=compression_strategy,
+                                                  compression_workers=compression_workers)
+            sidecars.append(sidecar)
+            size += sidecar_size
+
+    # Serialize, compress and encode data chunk by chunk while writing the HTML file (identical buffers are stored once)
+    data = iter_b64encode(iter_deflate(iter_packb(deduplicate(snapshot)), **compression))
+    size += write_html(filename=filename, template=template,
+                       fields={'DATA': data, 'SIDECARS': dumps(sidecars).encode()})
+    return size
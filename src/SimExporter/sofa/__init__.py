@@ -1 +1,22 @@
-from SimExporter.sofa.exporter import Exporter
+from typing import TYPE_CHECKING, Any, List
+from importlib import import_module
+
+if TYPE_CHECKING:
+    from SimExporter.sofa.exporter import Exporter
+    from SimExporter.sofa.parallel import record_batch
+
+# The API is imported on first access so that SOFA and the heavy dependencies (k3d, vtk, vedo) are only loaded when used
+_LAZY_ATTRIBUTES = {'Exporter': 'SimExporter.sofa.exporter',
+                    'record_batch': 'SimExporter.sofa.parallel'}
+
+
+def __getattr__(name: str) -> Any:
+    if name in _LAZY_ATTRIBUTES:
+        value = getattr(import_module(_LAZY_ATTRIBUTES[name]), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module '{__name__}' has no attribute '{name}'")
+
+
+def __dir__() -> List[str]:
+    return sorted(set(globals().keys()) | set(_LAZY_ATTRIBUTES.keys()))
@@ -1,15 +1,34 @@
-from typing import Optional, Union, List, Dict
-
+from typing import Optional, Union, List, Dict, Any
+from numpy import ndarray, array, arange
 import Sofa
 
-from SimExporter.core.exporter import Exporter as _Exporter
+from SimExporter.core.exporter import Exporter as _Exporter, OBJECT_IDS
+from SimExporter.core.factory import Factory as _Factory
+from SimExporter.core.snapshot import get_snapshot
+from SimExporter.core.quantization import quantize_snapshot
+from SimExporter.core.pruning import prune_snapshot
+from SimExporter.core.sidecar import is_time_series
+from SimExporter.core.scene import get_bounds
+from SimExporter.core.writer import write_snapshot, write_sidecar
 from SimExporter.sofa.factory import Factory
 from SimExporter.sofa.recorder import Recorder
 
 
 class Exporter(_Exporter):
 
-    def __init__(self, root: Sofa.Core.Node, dt: Optional[float] = None, animation: bool = False, fps: float = 25.):
+    def __init__(self,
+                 root: Sofa.Core.Node,
+                 dt: Optional[float] = None,
+                 animation: bool = False,
+                 fps: float = 25.,
+                 keyframe_tolerance: Optional[float] = None,
+                 record_directory: Optional[str] = None,
+                 record_window: int = 64,
+                 record_async: bool = False,
+                 record_queue_size: int = 16,
+                 record_threshold: Optional[float] = None,
+                 record_min_interval: Optional[float] = None,
+                 record_max_interval: Optional[float] = None):
         """
         Main API to create a scene with 3D objects and export a standalone 3D plot or animation in an HTML file.
 
@@ -18,18 +37,52 @@ class Exporter(_Exporter):
         :param animation: If False, a static 3D plot is exported. If True, a 3D animation is exported if time series
                           are associated to a 3D object.
         :param fps: Frame rate of the animation (not used if animation = False).
+        :param keyframe_tolerance: If provided, the recorded frames that are rebuilt by linear interpolation of the kept
+                                   frames with an absolute error lower than this tolerance are dropped (can be
+                                   overridden for each object).
+        :param record_directory: If provided, the recorded frames are stored in files in this directory instead of in
+                                 memory, so that long simulations are limited by the disk space. The export reads the
+                                 frames from these files.
+        :param record_window: Number of recorded frames kept in memory before being written in the files.
+        :param record_async: If True, the simulation step only copies the recorded values, the conversion and the
+                             storage of the frames are done by a background thread.
+        :param record_queue_size: Maximal number of recorded frames waiting to be stored by the background thread, the
+                                  simulation waits when the queue is full.
+        :param record_threshold: If provided, a frame is recorded only when a recorded value (positions, vectors, color
+                                 map values, colors) changed by more than this threshold since the last recorded frame.
+                                 The frames keep their simulation time in the animation.
+        :param record_min_interval: Minimal simulation time between two recorded frames with a threshold.
+        :param record_max_interval: Maximal simulation time between two recorded frames with a threshold.
         """
 
-        super().__init__(animation=animation, fps=fps)
+        super().__init__(animation=animation, fps=fps, keyframe_tolerance=keyframe_tolerance)
 
         # Create a SOFA factory to easily add 3D objects in the scene and record SOFA Data
-        self.__recorder = Recorder(root=root, dt=dt)
-        self.objects = Factory(recorder=self.__recorder, plt=self._plt, animation=animation)
+        self.__recorder = Recorder(root=root, dt=dt, record_directory=record_directory, record_window=record_window,
+                                   record_async=record_async, record_queue_size=record_queue_size,
+                                   record_threshold=record_threshold, record_min_interval=record_min_interval,
+                                   record_max_interval=record_max_interval)
+        self.objects = Factory(recorder=self.__recorder, plt=lambda: self._plt, animation=animation,
+                               keyframe_tolerance=keyframe_tolerance)
         self.dt = dt
+        self.__animation = animation
+        self.__keyframe_tolerance = keyframe_tolerance
+
+        # Checkpoints variables: identifiers of the recorded objects and sidecar files already written
+        self.__checkpoint_ids: List[int] = []
+        self.__checkpoint_sidecars: Dict[str, Any] = {}
 
-        # Camera variable (the parent's set_camera method won't work as objects are added to plotter at export)
+        # Camera variable (the parent's set_camera method won't work as the recorded objects are only built at export)
         self.__camera_parameters: Optional[Dict] = None
 
+    def close(self) -> None:
+        """
+        End the recording of the SOFA Data fields, to call when the simulation is over. The files of the recorded frames
+        are closed (see 'record_directory'), the scene can still be exported.
+        """
+
+        self.__recorder.close()
+
     def set_camera(self,
                    factor: float = 1.,
                    yaw: float = 0.,
@@ -45,29 +98,200 @@ class Exporter(_Exporter):
         self.__camera_parameters = locals()
         del self.__camera_parameters['self']
 
-    def to_html(self,
-                filename: str,
-                background_color: Union[str, List] = 'white',
-                grid_visible: bool = True,
-                menu_visible: bool = True,
-                frame_visible: bool = True) -> None:
+    def get_snapshot(self,
+                     background_color: Union[str, List] = 'white',
+                     grid_visible: bool = True,
+                     menu_visible: bool = True,
+                     frame_visible: bool = True) -> Dict[str, Any]:
+        """
+        Get the snapshot of the current scene, containing the serialized objects and the plot parameters.
+
+        :param background_color: Color of the background in the 3D view.
+        :param grid_visible: If True, the reference grid is displayed.
+        :param menu_visible: If True, the menu panel is displayed.
+        :param frame_visible: If True, the reference frame is displayed.
+        """
+
+        # The recorded objects are built in a separate scene, so that the scene can be exported several times
+        return self.__get_snapshot(frames=None, background_color=background_color, grid_visible=grid_visible,
+                                   menu_visible=menu_visible, frame_visible=frame_visible)
+
+    def set_checkpoints(self,
+                        filename: str,
+                        frames: int,
+                        sidecar_frames: int = 50,
+                        background_color: Union[str, List] = 'white',
+                        grid_visible: bool = True,
+                        menu_visible: bool = True,
+                        frame_visible: bool = True,
+                        compression_level: int = 9,
+                        compression_strategy: str = 'default',
+                        compression_workers: int = 1,
+                        cache_dir: Optional[str] = None) -> None:
+        """
+        Export the running simulation in an HTML file periodically, see the 'checkpoint' method.
+
+        :param filename: Name of the HTML file.
+        :param frames: Number of recorded frames between two checkpoints.
+        :param sidecar_frames: Number of frames in each sidecar file.
+        :param background_color: Color of the background in the 3D view.
+        :param grid_visible: If True, the reference grid is displayed.
+        :param menu_visible: If True, the menu panel is displayed.
+        :param frame_visible: If True, the reference frame is displayed.
+        :param compression_level: Compression level of the data, from 0 (no compression) to 9 (best compression).
+        :param compression_strategy: Compression strategy of the data, either 'default', 'filtered', 'huffman', 'rle'
+                                     or 'fixed'.
+        :param compression_workers: Number of threads to compress the data.
+        :param cache_dir: If provided, the HTML template is cached on disk in this directory to be shared between
+                          processes.
+        """
+
+        parameters = locals()
+        del parameters['self'], parameters['frames']
+        self.__recorder.set_checkpoint(checkpoint=lambda: self.checkpoint(**parameters), frames=frames)
+
+    def checkpoint(self,
+                   filename: str,
+                   sidecar_frames: int = 50,
+                   background_color: Union[str, List] = 'white',
+                   grid_visible: bool = True,
+                   menu_visible: bool = True,
+                   frame_visible: bool = True,
+                   compression_level: int = 9,
+                   compression_strategy: str = 'default',
+                   compression_workers: int = 1,
+                   cache_dir: Optional[str] = None) -> None:
         """
-        Export the current scene in a standalone HTML file.
+        Export the frames recorded so far in an HTML file, while the simulation is running. The first and the last
+        recorded frames are embedded in the HTML file and the other frames are written in binary sidecar files (see
+        the 'sidecar_frames' option of 'to_html'). The complete sidecar files are written once and kept by the next
+        checkpoints in the same file, so that each checkpoint only encodes the new frames. The HTML file must be served
+        with its sidecar files by an HTTP server.
 
         :param filename: Name of the HTML file.
+        :param sidecar_frames: Number of frames in each sidecar file.
         :param background_color: Color of the background in the 3D view.
         :param grid_visible: If True, the reference grid is displayed.
         :param menu_visible: If True, the menu panel is displayed.
         :param frame_visible: If True, the reference frame is displayed.
+        :param compression_level: Compression level of the data, from 0 (no compression) to 9 (best compression).
+        :param compression_strategy: Compression strategy of the data, either 'default', 'filtered', 'huffman', 'rle'
+                                     or 'fixed'.
+        :param compression_workers: Number of threads to compress the data.
+        :param cache_dir: If provided, the HTML template is cached on disk in this directory to be shared between
+                          processes.
         """
 
-        # Add the sofa objects to the scene
-        self.__recorder.process(factory=self.objects)
+        filename = f'{filename}.html' if not filename.endswith('.html') else filename
+        compression = {'compression_level': compression_level, 'compression_strategy': compression_strategy,
+                       'compression_workers': compression_workers}
+        n_frames = self.__recorder.get_frames_count()
+
+        # The sidecar files of a previous checkpoint are kept only with the same file and the same chunks size
+        if self.__checkpoint_sidecars.get('key') != (filename, sidecar_frames):
+            self.__checkpoint_sidecars = {'key': (filename, sidecar_frames), 'complete': []}
+        complete = self.__checkpoint_sidecars['complete']
+
+        # Write the new chunks of frames between the first and the last frames (the last incomplete chunk is written
+        # again by the next checkpoint)
+        sidecars = [sidecar for sidecar in complete if sidecar is not None]
+        i = len(complete)
+        while self.__animation and 1 + i * sidecar_frames < n_frames - 1:
+            frames = arange(1 + i * sidecar_frames, min(1 + (i + 1) * sidecar_frames, n_frames - 1))
+            sidecar = self.__write_sidecar(filename=f'{filename[:-len(".html")]}.{i}.bin', frames=frames,
+                                           **compression)
+            if len(frames) == sidecar_frames:
+                complete.append(sidecar)
+            if sidecar is not None:
+                sidecars.append(sidecar)
+            i += 1
+
+        # Get the snapshot of the scene with the first and the last recorded frames
+        snapshot = self.__get_snapshot(frames=[0, n_frames - 1] if n_frames > 1 else [0],
+                                       background_color=background_color, grid_visible=grid_visible,
+                                       menu_visible=menu_visible, frame_visible=frame_visible)
+
+        # Write the HTML file
+        write_snapshot(snapshot=snapshot, filename=filename, cache_dir=cache_dir, sidecars=sidecars, **compression)
+
+    def __get_snapshot(self,
+                       frames: Optional[List[int]],
+                       background_color: Union[str, List],
+                       grid_visible: bool,
+                       menu_visible: bool,
+                       frame_visible: bool) -> Dict[str, Any]:
+        """
+        Get the snapshot of the scene with the recorded objects. The recorded objects are not added to the scene.
+
+        :param frames: If provided, only these recorded frames are exported. By default, all the recorded frames are.
+        :param background_color: Color of the background in the 3D view.
+        :param grid_visible: If True, the reference grid is displayed.
+        :param menu_visible: If True, the menu panel is displayed.
+        :param frame_visible: If True, the reference frame is displayed.
+        """
+
+        snapshot = super().get_snapshot(background_color=background_color, grid_visible=grid_visible,
+                                        menu_visible=menu_visible, frame_visible=frame_visible)
+        if self.__recorder.get_frames_count() > 0:
+            snapshot['objects'] += self.__get_recorded_objects(frames=frames)
+
+        # Set default camera (the objects of the scene and the recorded objects are bounded with their serialized data)
+        bounds = get_bounds(snapshot['objects'])
+        if self.__camera_parameters is not None and bounds is not None:
+            snapshot['plot']['camera'] = self._plt.get_auto_camera(**self.__camera_parameters, bounds=array(bounds))
+        return snapshot
+
+    def __write_sidecar(self,
+                        filename: str,
+                        frames: ndarray,
+                        compression_level: int,
+                        compression_strategy: str,
+                        compression_workers: int) -> Optional[Dict[str, Any]]:
+        """
+        Write some recorded frames in a sidecar file.
+
+        :param filename: Name of the sidecar file.
+        :param frames: Indices of the recorded frames.
+        :param compression_level: Compression level of the data.
+        :param compression_strategy: Compression strategy of the data.
+        :param compression_workers: Number of threads to compress the data.
+        :return: The description of the sidecar file, or None if there is no time series in these frames.
+        """
+
+        # Only keep the time series of the objects
+        objects = []
+        for obj in self.__get_recorded_objects(frames=frames):
+            series = {name: value for name, value in obj.items() if is_time_series(value)}
+            if len(series) > 0:
+                objects.append({'id': obj['id'], **series})
+        times = [float(key) for obj in objects for name, series in obj.items() if name != 'id' for key in series]
+        if len(times) == 0:
+            return None
+
+        chunk = {'start': min(times), 'end': max(times), 'objects': objects}
+        sidecar, _ = write_sidecar(filename=filename, chunk=chunk, compression_level=compression_level,
+                                   compression_strategy=compression_strategy, compression_workers=compression_workers)
+        return sidecar
+
+    def __get_recorded_objects(self, frames: Optional[Union[ndarray, List[int]]]) -> List[Dict[str, Any]]:
+        """
+        Get the serialized recorded objects with some of the recorded frames. The objects are built in a separate
+        scene, each recorded object keeps the same identifier between the exports.
+
+        :param frames: Indices of the recorded frames, all the recorded frames if None.
+        """
 
-        # Set default camera
-        if self.__camera_parameters is not None:
-            super().set_camera(**self.__camera_parameters)
+        # Build the objects in a separate scene
+        from k3d import Plot
+        plt = Plot()
+        factory = _Factory(plt=lambda: plt, animation=self.__animation, keyframe_tolerance=self.__keyframe_tolerance)
+        self.__recorder.process(factory=factory, frames=frames)
+        objects = quantize_snapshot(snapshot=prune_snapshot(get_snapshot(plt)),
+                                    errors=factory.get_quantization())['objects']
 
-        # Export HTML file
-        super().to_html(filename=filename, background_color=background_color, grid_visible=grid_visible,
-                        menu_visible=menu_visible, frame_visible=frame_visible)
+        # Give the same identifier to the same recorded object
+        while len(self.__checkpoint_ids) < len(objects):
+            self.__checkpoint_ids.append(next(OBJECT_IDS))
+        for obj, object_id in zip(objects, self.__checkpoint_ids):
+            obj['id'] = object_id
+        return objects
@@ -1,24 +1,32 @@
-from typing import Optional, Union, List, Callable
-from numpy import ndarray
-from k3d import Plot
+from typing import Optional, Union, List, Callable, TYPE_CHECKING
+from numpy import ndarray, asarray
 import Sofa
 
-from SimExporter.core.factory import Factory as _Factory
+from SimExporter.core.factory import Factory as _Factory, convert_colors
+from SimExporter.core.geometry import select_cells
 from SimExporter.sofa.recorder import Recorder
 
+if TYPE_CHECKING:
+    from k3d import Plot
+
 
 class Factory(_Factory):
 
-    def __init__(self, recorder: Recorder, plt: Plot, animation: bool):
+    def __init__(self,
+                 recorder: Recorder,
+                 plt: Union['Plot', Callable[[], 'Plot']],
+                 animation: bool,
+                 keyframe_tolerance: Optional[float] = None):
         """
         API to create k3d objects and record data during a SOFA simulation.
 
         :param recorder: SOFA Data recorder.
-        :param plt: k3d plotter used to render the objects.
+        :param plt: k3d plotter used to render the objects, or a function that returns it.
         :param animation: If True, existing time series are associated to the 3D objects.
+        :param keyframe_tolerance: Default keyframe tolerance of the time series, see Factory.add_sofa_mesh.
         """
 
-        super().__init__(plt=plt, animation=animation)
+        super().__init__(plt=plt, animation=animation, keyframe_tolerance=keyframe_tolerance)
         self.__recorder = recorder
 
     def add_sofa_mesh(self,
@@ -30,7 +38,15 @@ class Factory(_Factory):
                       flat_shading: bool = True,
                       colormap_name: str = 'jet',
                       colormap_range: Optional[List[int]] = None,
-                      colormap_function: Optional[Callable] = None) -> None:
+                      colormap_function: Optional[Callable] = None,
+                      quantization_error: Optional[float] = None,
+                      keyframe_tolerance: Optional[float] = None,
+                      triangle_budget: Optional[int] = None,
+                      colors: Optional[Union[ndarray, List]] = None,
+                      colors_function: Optional[Callable] = None,
+                      boundary: bool = False,
+                      compact: bool = False,
+                      indices: Optional[Union[ndarray, List[int]]] = None) -> None:
         """
         Create a new Mesh object and record it automatically during the SOFA simulation.
 
@@ -45,21 +61,48 @@ class Factory(_Factory):
         :param colormap_range: Range of the color map.
         :param colormap_function: Function to compute at each time step the scalar values to color the mesh regarding
                                   the color map.
+        :param quantization_error: If provided, the recorded frames are quantized with 8 or 16 bits integers so that the
+                                   absolute error on each value is lower than this bound.
+        :param keyframe_tolerance: If provided, the recorded frames that are rebuilt by linear interpolation of the kept
+                                   frames with an absolute error lower than this tolerance are dropped. By default, the
+                                   tolerance of the Exporter is used.
+        :param triangle_budget: If provided, the mesh is decimated once to have at most this number of triangles, the
+                                recorded positions of the kept vertices are exported.
+        :param colors: Colors of each vertex, either an array of [R, G, B] values or a list of 'color names' and/or
+                       [R, G, B] values. The color map values are used instead if provided.
+        :param colors_function: Function to compute at each time step the [R, G, B] values of each vertex.
+        :param boundary: If True, the cells are tetrahedra or hexahedra (VTK vertex ordering) and only the boundary
+                         faces of the volume are exported.
+        :param compact: If True, only the recorded positions of the vertices used by the cells are exported. With
+                        'boundary', only the vertices of the boundary faces are exported.
+        :param indices: If provided, only these vertices are recorded (positions, color map values and colors), the
+                        cells with other vertices are removed.
         """
 
         # Core mesh data
         args = {key: value for key, value in locals().items()
-                if key not in ['self', 'positions_data', 'colormap_function']}
+                if key not in ['self', 'positions_data', 'colormap_function', 'colors_function', 'indices']}
+
+        # Restrict the mesh to the recorded subset of vertices, the cells are remapped once
+        if indices is not None:
+            indices = asarray(indices)
+            args['cells'] = select_cells(cells=cells, indices=indices, n_vertices=len(positions_data.array()))
+            if colors is not None:
+                args['colors'] = convert_colors(colors)[indices]
 
         # SOFA callbacks
-        callbacks = [('positions', positions_data, [positions_data.array().copy()])]
+        callbacks = [('positions', positions_data, self.__recorder.create_buffer(positions_data.array(), indices))]
         if colormap_function is not None:
-            callbacks.append(('colormap_values', colormap_function, [colormap_function()]))
+            callbacks.append(('colormap_values', colormap_function,
+                              self.__recorder.create_buffer(colormap_function(), indices)))
+        if colors_function is not None:
+            callbacks.append(('colors', colors_function, self.__recorder.create_buffer(colors_function(), indices)))
 
         # Record the object
         self.__recorder.add_object(object_type='mesh',
                                    object_data=args,
-                                   callbacks=callbacks)
+                                   callbacks=callbacks,
+                                   indices=indices)
 
     def add_sofa_points(self,
                         positions_data: Sofa.Core.Data,
@@ -68,7 +111,12 @@ class Factory(_Factory):
                         point_size: int = 0.1,
                         colormap_name: str = 'jet',
                         colormap_range: Optional[List[int]] = None,
-                        colormap_function: Optional[Callable] = None) -> None:
+                        colormap_function: Optional[Callable] = None,
+                        quantization_error: Optional[float] = None,
+                        keyframe_tolerance: Optional[float] = None,
+                        colors: Optional[Union[ndarray, List]] = None,
+                        colors_function: Optional[Callable] = None,
+                        indices: Optional[Union[ndarray, List[int]]] = None) -> None:
         """
         Create a new Points object and record it automatically during the SOFA simulation.
 
@@ -81,21 +129,40 @@ class Factory(_Factory):
         :param colormap_range: Range of the color map.
         :param colormap_function: Function to compute at each time step the scalar values to color the points regarding
                                   the color map.
+        :param quantization_error: If provided, the recorded frames are quantized with 8 or 16 bits integers so that the
+                                   absolute error on each value is lower than this bound.
+        :param keyframe_tolerance: If provided, the recorded frames that are rebuilt by linear interpolation of the kept
+                                   frames with an absolute error lower than this tolerance are dropped. By default, the
+                                   tolerance of the Exporter is used.
+        :param colors: Colors of each point, either an array of [R, G, B] values or a list of 'color names' and/or
+                       [R, G, B] values. The color map values are used instead if provided.
+        :param colors_function: Function to compute at each time step the [R, G, B] values of each point.
+        :param indices: If provided, only these points are recorded (positions, color map values and colors).
         """
 
         # Core points data
         args = {key: value for key, value in locals().items()
-                if key not in ['self', 'positions_data', 'colormap_function']}
+                if key not in ['self', 'positions_data', 'colormap_function', 'colors_function', 'indices']}
+
+        # Restrict the points to the recorded subset
+        if indices is not None:
+            indices = asarray(indices)
+            if colors is not None:
+                args['colors'] = convert_colors(colors)[indices]
 
         # Sofa callbacks
-        callbacks = [('positions', positions_data, [positions_data.array().copy()])]
+        callbacks = [('positions', positions_data, self.__recorder.create_buffer(positions_data.array(), indices))]
         if colormap_function is not None:
-            callbacks.append(('colormap_values', colormap_function, [colormap_function()]))
+            callbacks.append(('colormap_values', colormap_function,
+                              self.__recorder.create_buffer(colormap_function(), indices)))
+        if colors_function is not None:
+            callbacks.append(('colors', colors_function, self.__recorder.create_buffer(colors_function(), indices)))
 
         # Record the object
         self.__recorder.add_object(object_type='points',
                                    object_data=args,
-                                   callbacks=callbacks)
+                                   callbacks=callbacks,
+                                   indices=indices)
 
     def add_sofa_arrows(self,
                         positions_data: Sofa.Core.Data,
@@ -103,7 +170,12 @@ class Factory(_Factory):
                         color: Union[str, List] = 'green',
                         scale: float = 1.,
                         head_size: float = 1.,
-                        line_width: float = 0.02):
+                        line_width: float = 0.02,
+                        quantization_error: Optional[float] = None,
+                        keyframe_tolerance: Optional[float] = None,
+                        colors: Optional[Union[ndarray, List]] = None,
+                        colors_function: Optional[Callable] = None,
+                        indices: Optional[Union[ndarray, List[int]]] = None):
         """
         Create a new Vectors object and record it automatically during the SOFA simulation.
 
@@ -113,17 +185,35 @@ class Factory(_Factory):
         :param scale: Scale to apply on the vectors.
         :param head_size: Size of the head of the vectors.
         :param line_width: Width of the vectors.
+        :param quantization_error: If provided, the recorded frames are quantized with 8 or 16 bits integers so that the
+                                   absolute error on each value is lower than this bound.
+        :param keyframe_tolerance: If provided, the recorded frames that are rebuilt by linear interpolation of the kept
+                                   frames with an absolute error lower than this tolerance are dropped. By default, the
+                                   tolerance of the Exporter is used.
+        :param colors: Colors of each vector, either an array of [R, G, B] values or a list of 'color names' and/or
+                       [R, G, B] values.
+        :param colors_function: Function to compute at each time step the [R, G, B] values of each vector.
+        :param indices: If provided, only these vectors are recorded (positions, vectors and colors).
         """
 
         # Core arrows data
         args = {key: value for key, value in locals().items()
-                if key not in ['self', 'positions_data', 'vectors_data']}
+                if key not in ['self', 'positions_data', 'vectors_data', 'colors_function', 'indices']}
+
+        # Restrict the arrows to the recorded subset
+        if indices is not None:
+            indices = asarray(indices)
+            if colors is not None:
+                args['colors'] = convert_colors(colors)[indices]
 
         # SOFA callbacks
-        callbacks = [('positions', positions_data, [positions_data.array().copy()]),
-                     ('vectors', vectors_data, [vectors_data.array().copy()])]
+        callbacks = [('positions', positions_data, self.__recorder.create_buffer(positions_data.array(), indices)),
+                     ('vectors', vectors_data, self.__recorder.create_buffer(vectors_data.array(), indices))]
+        if colors_function is not None:
+            callbacks.append(('colors', colors_function, self.__recorder.create_buffer(colors_function(), indices)))
 
         # Record the object
         self.__recorder.add_object(object_type='arrows',
                                    object_data=args,
-                                   callbacks=callbacks)
+                                   callbacks=callbacks,
+                                   indices=indices)
@@ -0,0 +1,77 @@
+from typing import List, Optional, Callable
+from concurrent.futures import ProcessPoolExecutor
+from os import cpu_count
+from os.path import join
+import Sofa
+import Sofa.Simulation
+
+from SimExporter.core.exporter import Exporter as _Exporter
+from SimExporter.sofa.exporter import Exporter
+
+
+def record_batch(scenes: List[Callable[[Sofa.Core.Node], Exporter]],
+                 steps: int,
+                 directory: str,
+                 offsets: Optional[List[List[float]]] = None,
+                 workers: Optional[int] = None,
+                 fps: float = 25.) -> _Exporter:
+    """
+    Record several SOFA simulations in parallel, using a pool of processes, and merge them in a single scene. Each
+    simulation runs in its own process with its own Recorder, its recorded objects are saved in a scene file (see
+    Exporter.save) and the scene files are loaded in the merged scene without reading the frames (see Exporter.load).
+
+    :param scenes: Picklable functions that create a SOFA simulation in the given root node, create its Exporter, add
+                   the objects to record and return the Exporter (called in the worker processes).
+    :param steps: Number of time steps of each simulation.
+    :param directory: Directory of the scene file of each simulation.
+    :param offsets: If provided, [x, y, z] translation of each simulation in the merged scene.
+    :param workers: Number of processes. By default, the number of CPUs is used.
+    :param fps: Frame rate of the animation of the merged scene.
+    :return: The merged scene, to export with 'to_html'.
+    """
+
+    if offsets is not None and len(offsets) != len(scenes):
+        raise ValueError(f'The number of scenes ({len(scenes)}) and offsets ({len(offsets)}) must be the same.')
+
+    # Run each simulation in a worker process
+    workers = cpu_count() if workers is None else workers
+    with ProcessPoolExecutor(max_workers=min(workers, max(len(scenes), 1))) as pool:
+        futures = [pool.submit(_record, scene, join(directory, f'scene_{i}.bin'), steps)
+                   for i, scene in enumerate(scenes)]
+        filenames = [future.result() for future in futures]
+
+    # Merge the recorded scenes (the binary data of the scene files is memory-mapped)
+    exporter = _Exporter(animation=True, fps=fps)
+    for i, filename in enumerate(filenames):
+        exporter.load(filename=filename, offset=None if offsets is None else offsets[i])
+
+    # Fit the camera to all the simulations
+    exporter.set_camera()
+    return exporter
+
+
+def _record(scene: Callable[[Sofa.Core.Node], Exporter],
+            filename: str,
+            steps: int) -> str:
+    """
+    Run and record a SOFA simulation in a worker process.
+
+    :param scene: Function that creates the SOFA simulation and returns its Exporter.
+    :param filename: Name of the scene file.
+    :param steps: Number of time steps of the simulation.
+    :return: The name of the scene file.
+    """
+
+    # Create the SOFA simulation and its Exporter, then init the simulation (after the creation of the Exporter)
+    root = Sofa.Core.Node('root')
+    exporter = scene(root)
+    Sofa.Simulation.init(root)
+
+    # Run the simulation, the frames are recorded by the Recorder of the Exporter
+    for _ in range(steps):
+        Sofa.Simulation.animate(root, root.dt.value)
+
+    # End the recording and save the recorded objects
+    exporter.close()
+    exporter.save(filename=filename)
+    return filename
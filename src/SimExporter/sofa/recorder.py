@@ -1,18 +1,45 @@
-from typing import Optional, List, Tuple, Dict, Any
-from numpy import array, ndarray
+from typing import Optional, List, Tuple, Dict, Any, Union, Callable
+from os import makedirs
+from os.path import join
+from queue import Queue
+from threading import Thread
+from functools import reduce
+from numpy import ndarray, array, asarray, array_equal, union1d, abs as np_abs
 import Sofa
 
 from SimExporter.core.factory import Factory
+from SimExporter.sofa.storage import FrameBuffer, DiskFrameBuffer
 
 
 class Recorder(Sofa.Core.Controller):
 
-    def __init__(self, root: Sofa.Core.Node, dt: Optional[float], *args, **kwargs):
+    def __init__(self,
+                 root: Sofa.Core.Node,
+                 dt: Optional[float],
+                 record_directory: Optional[str] = None,
+                 record_window: int = 64,
+                 record_async: bool = False,
+                 record_queue_size: int = 16,
+                 record_threshold: Optional[float] = None,
+                 record_min_interval: Optional[float] = None,
+                 record_max_interval: Optional[float] = None,
+                 *args, **kwargs):
         """
         Component to record the registered Data fields in the SOFA simulation.
 
         :param root: Root node of the SOFA scene graph.
         :param dt: Time between each frame record.
+        :param record_directory: If provided, the recorded frames are stored in files in this directory instead of in
+                                 memory.
+        :param record_window: Number of frames kept in memory before being written in the files.
+        :param record_async: If True, the simulation step only copies the recorded values, they are stored by a
+                             background thread.
+        :param record_queue_size: Maximal number of recorded frames waiting to be stored, the simulation waits when the
+                                  queue is full.
+        :param record_threshold: If provided, a frame is recorded only when a recorded value (Data field or function)
+                                 changed by more than this threshold since the last recorded frame, instead of each dt.
+        :param record_min_interval: Minimal time between two recorded frames with a threshold.
+        :param record_max_interval: Maximal time between two recorded frames with a threshold.
         """
 
         super().__init__(name='Exporter', *args, **kwargs)
@@ -23,7 +50,36 @@ class Recorder(Sofa.Core.Controller):
 
         # Memory
         self.__sofa_objects_data: Dict[str, Dict[str, Any]] = {}
-        self.__sofa_callbacks: Dict[str, List[Tuple[str, Sofa.Core.Data, List[ndarray]]]] = {}
+        self.__sofa_callbacks: Dict[str, List[Tuple[str, Sofa.Core.Data, Union[FrameBuffer, DiskFrameBuffer]]]] = {}
+        self.__sofa_indices: Dict[str, ndarray] = {}
+
+        # Disk storage
+        self.__record_directory = record_directory
+        self.__record_window = record_window
+        self.__n_buffers = 0
+        if record_directory is not None:
+            makedirs(record_directory, exist_ok=True)
+
+        # Asynchronous storage
+        self.__queue: Optional[Queue] = None
+        self.__thread: Optional[Thread] = None
+        self.__worker_error: Optional[BaseException] = None
+        if record_async:
+            self.__queue = Queue(maxsize=max(record_queue_size, 1))
+            self.__thread = Thread(target=self.__store_frames, daemon=True)
+            self.__thread.start()
+
+        # Adaptive recording: step of each recorded frame and last recorded values of the Data fields
+        self.__record_threshold = record_threshold
+        self.__record_intervals = (record_min_interval, record_max_interval)
+        self.__min_steps, self.__max_steps = 1, None
+        self.__steps: List[int] = [0]
+        self.__last_values: Dict[int, ndarray] = {}
+
+        # Checkpoints: function called each 'checkpoint_frames' recorded frames and running color map ranges
+        self.__checkpoint: Optional[Callable] = None
+        self.__checkpoint_frames: Optional[int] = None
+        self.__colormap_ranges: Dict[str, List[float]] = {}
 
     def onSimulationInitDoneEvent(self, _):
         """
@@ -35,59 +91,277 @@ class Recorder(Sofa.Core.Controller):
         self.dt = root_dt if self.dt is None else max(self.dt, root_dt)
         self.dt = int(self.dt / root_dt)
 
+        # Convert the intervals of the adaptive recording to numbers of steps
+        min_interval, max_interval = self.__record_intervals
+        if min_interval is not None:
+            self.__min_steps = max(1, round(min_interval / root_dt))
+        if max_interval is not None:
+            self.__max_steps = max(1, round(max_interval / root_dt))
+
     def onAnimateBeginEvent(self, _):
         """
         SOFA event, automatically called at the end of each time step of the simulation.
         """
 
-        # Record a frame each dt
+        # Record a frame each dt, or when the recorded values changed enough with the adaptive recording (the values
+        # gathered for the comparison are recorded as they are)
         root = self.getContext()
-        if round((root.time.value + root.dt.value) / root.dt.value) % self.dt == 0:
-
-            # Record each object
-            for callbacks in self.__sofa_callbacks.values():
+        step = round((root.time.value + root.dt.value) / root.dt.value)
+        values: Dict[int, ndarray] = {}
+        if self.__record_threshold is None:
+            record = step % self.dt == 0
+        else:
+            record = self.__has_changed(step, values)
+        if record:
+            self.__steps.append(step)
 
-                # Record each callback
+            # Get a frame of each callback of each object, the raw values are copied once if they are kept after the
+            # time step (asynchronous storage or last recorded values of the adaptive recording)
+            frames = []
+            for key_name, callbacks in self.__sofa_callbacks.items():
                 for (_, data, time_series) in callbacks:
+                    value = values.get(id(time_series))
+                    if value is None:
+                        value = self.__get_value(key_name, data)
+                    if self.__queue is not None or self.__record_threshold is not None:
+                        value = array(value, copy=True)
+                    if self.__record_threshold is not None:
+                        self.__last_values[id(time_series)] = value
+                    frames.append((time_series, value))
+
+            # Synchronous storage: copy the frames in the buffers
+            if self.__queue is None:
+                for time_series, frame in frames:
+                    time_series.append(frame)
+
+            # Asynchronous storage: the background thread converts and stores the copied values (the simulation waits
+            # if the queue is full)
+            else:
+                if self.__thread is None:
+                    raise ValueError('The recording is closed, no frame can be recorded anymore.')
+                self.__check_storage()
+                self.__queue.put(frames)
 
-                    # Data callback (usually positions): get the current SOFA Data field value
-                    if isinstance(data, Sofa.Core.Data):
-                        time_series.append(data.array().copy())
-                    # Function callback (usually colormap values): get the current return of the function
-                    else:
-                        time_series.append(data())
+            # Periodic checkpoint
+            if self.__checkpoint is not None and (len(self.__steps) - 1) % self.__checkpoint_frames == 0:
+                self.__checkpoint()
+
+    def __has_changed(self, step: int, values: Dict[int, ndarray]) -> bool:
+        """
+        Check if a frame should be recorded with the adaptive recording: a recorded value (Data field or function, such
+        as the color map values) changed by more than the threshold since the last recorded frame, within the minimal
+        and maximal intervals.
+
+        :param step: Current step of the simulation.
+        :param values: Current values gathered for the comparison, by time series id (filled).
+        """
+
+        elapsed = step - self.__steps[-1]
+        if self.__max_steps is not None and elapsed >= self.__max_steps:
+            return True
+        if elapsed < self.__min_steps:
+            return False
+
+        # Compare the current values of the callbacks with the last recorded ones
+        for key_name, callbacks in self.__sofa_callbacks.items():
+            for (_, data, time_series) in callbacks:
+                if id(time_series) not in self.__last_values:
+                    self.__last_values[id(time_series)] = array(time_series[0])
+                value = values[id(time_series)] = self.__get_value(key_name, data)
+                if np_abs(value - self.__last_values[id(time_series)]).max() > self.__record_threshold:
+                    return True
+        return False
+
+    def __get_value(self, key_name: str, data: Union[Sofa.Core.Data, Callable]) -> ndarray:
+        """
+        Get the current value of a callback, restricted to the recorded subset of the object.
+
+        :param key_name: Name of the recorded object.
+        :param data: SOFA Data field or function.
+        """
+
+        # Data callback (usually positions): get the current SOFA Data field value, function callback (usually
+        # colormap values): get the current return of the function
+        value = data.array() if isinstance(data, Sofa.Core.Data) else data()
+
+        # Only gather the rows of the recorded subset
+        indices = self.__sofa_indices.get(key_name)
+        return value if indices is None else asarray(value)[indices]
+
+    def __store_frames(self) -> None:
+        """
+        Background thread of the asynchronous storage: store the frames of the queue in the buffers until the None
+        sentinel is received. After a storage error, the next frames are not stored so that the time series do not get
+        out of step, the error is raised in the simulation thread.
+        """
+
+        while True:
+            frames = self.__queue.get()
+            try:
+                if frames is None:
+                    return
+                if self.__worker_error is None:
+                    for time_series, frame in frames:
+                        time_series.append(frame)
+            except BaseException as error:
+                self.__worker_error = error
+            finally:
+                self.__queue.task_done()
 
     def add_object(self,
                    object_type: str,
                    object_data: Dict[str, Any],
-                   callbacks: List[Tuple[str, Sofa.Core.Data, List[ndarray]]]) -> None:
+                   callbacks: List[Tuple[str, Sofa.Core.Data, Union[FrameBuffer, DiskFrameBuffer]]],
+                   indices: Optional[ndarray] = None) -> None:
         """
         Define a new object to record.
 
         :param object_type: Type of the object('mesh', 'points, 'arrows').
         :param object_data: Core object data.
         :param callbacks: SOFA callbacks to record data.
+        :param indices: If provided, only these rows of the callbacks values are recorded.
         """
 
         key_name = f'{len(self.__sofa_objects_data)}_{object_type}'
         self.__sofa_objects_data[key_name] = object_data
         self.__sofa_callbacks[key_name] = callbacks
+        if indices is not None:
+            self.__sofa_indices[key_name] = indices
+
+    def set_checkpoint(self, checkpoint: Optional[Callable], frames: Optional[int] = None) -> None:
+        """
+        Define a function called periodically during the simulation.
+
+        :param checkpoint: Function called each 'frames' recorded frames, None to disable the checkpoints.
+        :param frames: Number of recorded frames between two checkpoints.
+        """
+
+        if checkpoint is not None and frames is None:
+            raise ValueError('The number of frames between two checkpoints must be provided.')
+        self.__checkpoint = checkpoint
+        self.__checkpoint_frames = max(1, frames) if frames is not None else None
 
-    def process(self, factory: Factory):
+    def close(self) -> None:
+        """
+        End the recording: wait for the stored frames, stop the storage thread and close the files of the frames. The
+        recorded frames can still be exported, but no frame can be recorded anymore.
+        """
+
+        # Stop the storage thread once the queued frames are stored
+        if self.__thread is not None:
+            self.__queue.put(None)
+            self.__thread.join()
+            self.__thread = None
+
+        # Close the files of the frames, even if some frames could not be stored
+        for callbacks in self.__sofa_callbacks.values():
+            for (_, _, time_series) in callbacks:
+                time_series.close()
+        self.__check_storage()
+
+    def get_frames_count(self) -> int:
+        """
+        Get the number of recorded frames.
+        """
+
+        self.__wait_storage()
+        for callbacks in self.__sofa_callbacks.values():
+            for (_, _, time_series) in callbacks:
+                return len(time_series)
+        return 0
+
+    def create_buffer(self,
+                      first_frame: ndarray,
+                      indices: Optional[ndarray] = None) -> Union[FrameBuffer, DiskFrameBuffer]:
+        """
+        Create the storage of the frames of a recorded channel, in memory or on disk.
+
+        :param first_frame: First recorded frame.
+        :param indices: If provided, only these rows of the frames are recorded.
+        """
+
+        if indices is not None:
+            first_frame = asarray(first_frame)[indices]
+
+        if self.__record_directory is None:
+            return FrameBuffer(first_frame=first_frame)
+        self.__n_buffers += 1
+        return DiskFrameBuffer(first_frame=first_frame,
+                               filename=join(self.__record_directory, f'frames_{self.__n_buffers - 1}.bin'),
+                               window=self.__record_window)
+
+    def process(self, factory: Factory, frames: Optional[Union[ndarray, List[int]]] = None) -> None:
         """
         Add the SOFA recorded objects to the k3d scene.
 
         :param factory: Objects API used to build the scene.
+        :param frames: If provided, only these recorded frames are added in the time series (the first recorded frame
+                       remains the static value of the objects). The frames keep their time in the animation.
         """
 
+        # Wait for the frames of the asynchronous storage
+        self.__wait_storage()
+
+        # Time of each recorded frame in number of dt (the frames of the adaptive recording keep their simulation time)
+        record_times = None
+        if self.__record_threshold is not None:
+            record_times = (array(self.__steps) - self.__steps[0]) / self.dt
+
         # Add each object
         for key_name in self.__sofa_objects_data.keys():
+            callbacks = self.__sofa_callbacks[key_name]
+
+            # Recorded frames of the time series: either the requested frames, or the stored frames of the fields (the
+            # first and the last frames of each run of equal frames are stored)
+            indices = frames
+            if frames is None:
+                stored = [time_series.times() for (_, _, time_series) in callbacks if not time_series.is_static()]
+                indices = reduce(union1d, stored) if len(stored) > 0 else None
 
-            # Add each time series to the core data
-            object_data = self.__sofa_objects_data[key_name]
-            for (field_name, _, time_series) in self.__sofa_callbacks[key_name]:
-                object_data[field_name] = time_series[0]
-                object_data[f'time_{field_name}'] = array(time_series)
+            # Add each time series to the core data, the fields that never changed are exported as static values
+            object_data = dict(self.__sofa_objects_data[key_name])
+            for (field_name, _, time_series) in callbacks:
+                object_data[field_name] = asarray(time_series[0])
+                if time_series.is_static():
+                    continue
+
+                # The stored frames are given without copy (float32 buffer or memory-mapped file), unless the fields
+                # of the object have different runs of equal frames
+                if frames is None and array_equal(time_series.times(), indices):
+                    series = time_series.array()
+                else:
+                    series = time_series.take(indices)
+                object_data[f'time_{field_name}'] = series
+
+                # A subset of the frames uses the color map range of all the frames processed so far
+                if frames is not None and field_name == 'colormap_values':
+                    v_min, v_max = float(series.min()), float(series.max())
+                    if key_name in self.__colormap_ranges:
+                        v_min = min(v_min, self.__colormap_ranges[key_name][0])
+                        v_max = max(v_max, self.__colormap_ranges[key_name][1])
+                    self.__colormap_ranges[key_name] = [v_min, v_max]
+                    if object_data.get('colormap_range') is None:
+                        object_data['colormap_range'] = [v_min, v_max]
+            if indices is not None:
+                object_data['frame_times'] = asarray(indices, dtype=float) if record_times is None else \
+                    record_times[indices]
 
             # Add the object in the k3d scene
             factory.__getattribute__(f'add_{key_name.split("_")[1]}')(**object_data)
+
+    def __wait_storage(self) -> None:
+        """
+        Wait for the frames of the asynchronous storage.
+        """
+
+        if self.__queue is not None:
+            self.__queue.join()
+            self.__check_storage()
+
+    def __check_storage(self) -> None:
+        """
+        Raise the error of the asynchronous storage, if any.
+        """
+
+        if self.__worker_error is not None:
+            raise RuntimeError('Recorded frames could not be stored.') from self.__worker_error
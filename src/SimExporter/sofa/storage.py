@@ -0,0 +1,278 @@
+from typing import List, Union, Tuple
+from json import dump, load
+from os.path import getsize
+from numbers import Integral
+from numpy import ndarray, memmap, empty, asarray, array_equal, arange, prod, dtype, searchsorted, fromfile, float32, \
+    int64
+
+
+class FrameBuffer:
+
+    def __init__(self, first_frame: ndarray, capacity: int = 64, growth: float = 1.5):
+        """
+        Contiguous float32 storage of the recorded frames of a SOFA Data field. The buffer is preallocated and grows
+        geometrically, so that the frames are copied once when they are recorded and the time series is never rebuilt
+        from a list of frames. The repeated frames are not stored: a run of equal frames is stored as its first frame
+        and its last frame, each stored frame keeps the index of the recorded frame (see 'times').
+
+        :param first_frame: First recorded frame, defines the shape of the frames.
+        :param capacity: Initial number of frames of the buffer.
+        :param growth: Growth factor of the buffer when it is full.
+        """
+
+        first_frame = asarray(first_frame)
+        self.__frames = empty((max(capacity, 1),) + first_frame.shape, dtype=float32)
+        self.__growth = growth
+        self.__size = 0
+        self.__count = 0
+        self.__times: List[int] = []
+        self.__hold = False
+        self.append(first_frame)
+
+    def append(self, frame: ndarray) -> None:
+        """
+        Copy a new frame at the end of the buffer, or move the end of the run of the last frame if it did not change.
+
+        :param frame: Recorded frame.
+        """
+
+        # Grow the buffer if it is full
+        if self.__size == len(self.__frames):
+            frames = empty((int(len(self.__frames) * self.__growth) + 1,) + self.__frames.shape[1:], dtype=float32)
+            frames[:self.__size] = self.__frames
+            self.__frames = frames
+
+        # Convert the frame in the next slot, keep it only if it is different from the last frame or if it is the end
+        # of a new run of equal frames
+        self.__frames[self.__size] = frame
+        self.__hold = _store(self.__frames[self.__size], self.__frames[self.__size - 1] if self.__size > 0 else None,
+                             self.__times, self.__count, self.__hold)
+        self.__size = len(self.__times)
+        self.__count += 1
+
+    def is_static(self) -> bool:
+        """
+        Check if all the recorded frames are the same.
+        """
+
+        return self.__size == 1 or (self.__size == 2 and self.__hold)
+
+    def close(self) -> None:
+        """
+        End the recording, nothing to release for the in-memory buffer (see DiskFrameBuffer.close).
+        """
+
+        pass
+
+    def array(self) -> ndarray:
+        """
+        Get the stored frames as a (n_stored_frames, ...) float32 view on the buffer (the repeated frames are not
+        expanded, see 'times').
+        """
+
+        return self.__frames[:self.__size]
+
+    def times(self) -> ndarray:
+        """
+        Get the index of the recorded frame of each stored frame.
+        """
+
+        return asarray(self.__times, dtype=int64)
+
+    def take(self, indices: Union[ndarray, List[int]]) -> ndarray:
+        """
+        Get some of the recorded frames, only the requested frames are copied.
+
+        :param indices: Indices of the recorded frames.
+        """
+
+        return self.array()[_rows(self.__times, indices)]
+
+    def __len__(self) -> int:
+        return self.__count
+
+    def __getitem__(self, item):
+        if isinstance(item, Integral):
+            return self.array()[_rows(self.__times, item % self.__count)]
+        return self.take(arange(self.__count)[item])
+
+
+class DiskFrameBuffer:
+
+    def __init__(self, first_frame: ndarray, filename: str, window: int = 64):
+        """
+        Float32 storage of the recorded frames of a SOFA Data field in a file on disk. The frames are kept in memory by
+        chunks of 'window' frames, then appended to the file. The file contains the raw frames, a JSON file describes
+        their shape and a binary file contains the index of the recorded frame of each stored frame, so that the
+        recorded frames are still usable if the simulation crashes (see load_frames). The repeated frames are not
+        stored: a run of equal frames is stored as its first frame and its last frame.
+
+        :param first_frame: First recorded frame, defines the shape of the frames.
+        :param filename: Path of the file of the frames.
+        :param window: Number of frames kept in memory before being appended to the file.
+        """
+
+        first_frame = asarray(first_frame)
+        self.__filename = filename
+        self.__shape = first_frame.shape
+        self.__count = 0
+        self.__times: List[int] = []
+        self.__hold = False
+
+        # Create the empty frames and times files, the description of the frames is written once
+        self.__file = open(filename, 'wb')
+        self.__times_file = open(f'{filename}.times', 'wb')
+        self.__flushed_times = 0
+        with open(f'{filename}.json', 'w') as file:
+            dump({'dtype': 'float32', 'shape': list(self.__shape), 'times': 'int64'}, file)
+
+        # In-memory window of the last recorded frames (plus the last stored frame to detect the repetitions)
+        self.__window = empty((max(window, 1),) + self.__shape, dtype=float32)
+        self.__last = empty(self.__shape, dtype=float32)
+        self.__pending = 0
+        self.append(first_frame)
+        self.flush()
+
+    def append(self, frame: ndarray) -> None:
+        """
+        Copy a new frame at the end of the buffer, or move the end of the run of the last frame if it did not change.
+
+        :param frame: Recorded frame.
+        """
+
+        if self.__file.closed:
+            raise ValueError(f'The frames file "{self.__filename}" is closed.')
+
+        # Convert the frame in the next slot, keep it only if it is different from the last frame or if it is the end
+        # of a new run of equal frames
+        self.__window[self.__pending] = frame
+        n_stored = len(self.__times)
+        self.__hold = _store(self.__window[self.__pending], self.__last if n_stored > 0 else None, self.__times,
+                             self.__count, self.__hold)
+        self.__count += 1
+        if len(self.__times) > n_stored:
+            self.__last[...] = self.__window[self.__pending]
+            self.__pending += 1
+            if self.__pending == len(self.__window):
+                self.flush()
+
+    def flush(self) -> None:
+        """
+        Append the frames of the in-memory window to the file and the new times to the times file.
+        """
+
+        if self.__file.closed:
+            return
+        if self.__pending > 0:
+            self.__file.write(memoryview(self.__window[:self.__pending]))
+            self.__file.flush()
+            self.__pending = 0
+
+        # Only the last written time can change (end of a run), it is written again with the new ones
+        start = max(self.__flushed_times - 1, 0)
+        self.__times_file.seek(start * 8)
+        self.__times_file.write(memoryview(asarray(self.__times[start:], dtype=int64)))
+        self.__times_file.flush()
+        self.__flushed_times = len(self.__times)
+
+    def close(self) -> None:
+        """
+        Write the remaining frames and close the files. The recorded frames remain readable.
+        """
+
+        self.flush()
+        self.__file.close()
+        self.__times_file.close()
+
+    def is_static(self) -> bool:
+        """
+        Check if all the recorded frames are the same.
+        """
+
+        return len(self.__times) == 1 or (len(self.__times) == 2 and self.__hold)
+
+    def array(self) -> ndarray:
+        """
+        Get the stored frames as a (n_stored_frames, ...) float32 read-only memory-mapped view on the file, the frames
+        are loaded from the disk when they are read (the repeated frames are not expanded, see 'times').
+        """
+
+        self.flush()
+        return memmap(self.__filename, dtype=float32, mode='r', shape=(len(self.__times),) + self.__shape)
+
+    def times(self) -> ndarray:
+        """
+        Get the index of the recorded frame of each stored frame.
+        """
+
+        return asarray(self.__times, dtype=int64)
+
+    def take(self, indices: Union[ndarray, List[int]]) -> ndarray:
+        """
+        Get some of the recorded frames, only these frames are read from the file.
+
+        :param indices: Indices of the recorded frames.
+        """
+
+        return self.array()[_rows(self.__times, indices)]
+
+    def __len__(self) -> int:
+        return self.__count
+
+    def __getitem__(self, item):
+        if isinstance(item, Integral):
+            return self.array()[_rows(self.__times, item % self.__count)]
+        return self.take(arange(self.__count)[item])
+
+
+def load_frames(filename: str) -> Tuple[ndarray, ndarray]:
+    """
+    Load the frames recorded in a file by a DiskFrameBuffer as a read-only memory-mapped array. An incomplete last
+    frame (interrupted recording) is ignored.
+
+    :param filename: Path of the file of the frames.
+    :return: The stored frames and the index of the recorded frame of each stored frame.
+    """
+
+    with open(f'{filename}.json') as file:
+        description = load(file)
+    shape = tuple(description['shape'])
+    frame_size = int(prod(shape)) * dtype(description['dtype']).itemsize
+    times = fromfile(f'{filename}.times', dtype=description['times'])
+    n_frames = min(getsize(filename) // frame_size, len(times))
+    return memmap(filename, dtype=description['dtype'], mode='r', shape=(n_frames,) + shape), times[:n_frames]
+
+
+def _store(frame: ndarray, last: Union[ndarray, None], times: List[int], index: int, hold: bool) -> bool:
+    """
+    Register a recorded frame converted in the next slot of a buffer. The frame is kept if it is different from the
+    last stored frame. A frame equal to the last stored frame is kept as the end of the run of equal frames, or only
+    moves the end of the run if it is already stored.
+
+    :param frame: Recorded frame in the next slot.
+    :param last: Last stored frame, None if no frame is stored yet.
+    :param times: Index of the recorded frame of each stored frame, updated.
+    :param index: Index of the recorded frame.
+    :param hold: True if the last stored frame is the end of a run of equal frames.
+    :return: True if the last stored frame is now the end of a run of equal frames.
+    """
+
+    if last is None or not array_equal(frame, last):
+        times.append(index)
+        return False
+    if hold:
+        times[-1] = index
+    else:
+        times.append(index)
+    return True
+
+
+def _rows(times: List[int], indices: Union[ndarray, List[int], int]) -> Union[ndarray, int]:
+    """
+    Get the stored frames of some recorded frames.
+
+    :param times: Index of the recorded frame of each stored frame.
+    :param indices: Indices of the recorded frames.
+    """
+
+    return searchsorted(times, indices, side='right') - 1
@@ -0,0 +1,167 @@
+var SimExporter = {
+
+    /**
+     * Functions applied to the decoded data (embedded snapshot and sidecar files) before it is given to K3D.
+     */
+    decoders: [
+        function (data) {
+            return SimExporter.resolveBuffers(data);
+        },
+        function (data) {
+            return SimExporter.dequantize(data);
+        },
+    ],
+
+    /**
+     * Decompress and decode a binary chunk of data.
+     * @param {Object} lib K3D library
+     * @param {Uint8Array} buffer Compressed data
+     */
+    decode: function (lib, buffer) {
+        return SimExporter.decoders.reduce(function (data, decoder) {
+            return decoder(data);
+        }, lib.msgpackDecode(fflate.unzlibSync(buffer)));
+    },
+
+    /**
+     * Create a K3D instance and load the embedded snapshot (same as lib.CreateK3DAndLoadBinarySnapshot, with the
+     * SimExporter decoders).
+     * @param {Object} lib K3D library
+     * @param {Uint8Array} buffer Compressed snapshot
+     * @param {Element} targetDOMNode Container of the 3D view
+     */
+    load: function (lib, buffer, targetDOMNode) {
+        var data = SimExporter.decode(lib, buffer);
+        var K3DInstance = new lib.K3D(lib.ThreeJsProvider, targetDOMNode, data.plot);
+
+        return K3DInstance.setSnapshot(data).then(function () {
+            setTimeout(function () {
+                if (data.plot.camera.length > 0) {
+                    K3DInstance.setCamera(data.plot.camera);
+                    K3DInstance.render();
+                }
+            }, 10);
+            return K3DInstance;
+        });
+    },
+
+    /**
+     * Replace the references to the shared buffers ('key_ref': index entries) with the buffers.
+     * @param {Object} data Decoded data
+     */
+    resolveBuffers: function (data) {
+        var buffers = data.buffers;
+
+        function resolve(value) {
+            if (value === null || typeof value !== 'object' || ArrayBuffer.isView(value)) {
+                return;
+            }
+            Object.keys(value).forEach(function (k) {
+                if (k.slice(-4) === '_ref' && typeof value[k] === 'number') {
+                    value[k.slice(0, -4)] = buffers[value[k]];
+                    delete value[k];
+                } else {
+                    resolve(value[k]);
+                }
+            });
+        }
+
+        if (typeof buffers !== 'undefined') {
+            delete data.buffers;
+            resolve(data.objects);
+        }
+        return data;
+    },
+
+    /**
+     * Restore the float32 values of the quantized arrays as 'offset + scale * q'.
+     * @param {*} value Decoded data or part of the decoded data
+     */
+    dequantize: function (value) {
+        var types = {uint8: Uint8Array, int16: Int16Array};
+        var quantized, data, i;
+
+        if (value === null || typeof value !== 'object' || ArrayBuffer.isView(value)) {
+            return value;
+        }
+        if (typeof value.quantized_data !== 'undefined') {
+            // Copy the bytes so that the typed array is aligned
+            quantized = new types[value.quantized_dtype](new Uint8Array(value.quantized_data).buffer);
+            data = new Float32Array(quantized.length);
+            for (i = 0; i < quantized.length; i++) {
+                data[i] = value.offset + value.scale * quantized[i];
+            }
+            return {dtype: 'float32', shape: value.shape, data: data};
+        }
+        Object.keys(value).forEach(function (k) {
+            value[k] = SimExporter.dequantize(value[k]);
+        });
+        return value;
+    },
+
+    /**
+     * Fetch the frames stored in the sidecar files: the file containing a requested time is fetched before displaying
+     * this time, the other files are fetched in the background.
+     * @param {Object} lib K3D library
+     * @param {Object} K3DInstance K3D instance
+     * @param {Array} sidecars List of the sidecar files with their url and time range
+     */
+    loadSidecars: function (lib, K3DInstance, sidecars) {
+        var loaded = {};
+        var setTime = K3DInstance.setTime;
+
+        if (sidecars.length === 0) {
+            return;
+        }
+
+        function load(i) {
+            if (!(i in loaded)) {
+                loaded[i] = fetch(sidecars[i].url)
+                    .then(function (response) {
+                        return response.arrayBuffer();
+                    })
+                    .then(function (buffer) {
+                        var world = K3DInstance.getWorld();
+                        SimExporter.decode(lib, new Uint8Array(buffer)).objects.forEach(function (o) {
+                            var json = world.ObjectsListJson[o.id];
+                            Object.keys(o).forEach(function (k) {
+                                var frames;
+                                if (k !== 'id') {
+                                    frames = lib.serialize.deserialize(o[k]);
+                                    Object.keys(frames).forEach(function (t) {
+                                        if (t !== 'timeSeries') {
+                                            json[k][t] = frames[t];
+                                        }
+                                    });
+                                }
+                            });
+                        });
+                    })
+                    .catch(function (e) {
+                        console.log(e);
+                    });
+            }
+            return loaded[i];
+        }
+
+        K3DInstance.setTime = function (time) {
+            var requested = sidecars.reduce(function (p, sidecar, i) {
+                if (time >= sidecar.start && time <= sidecar.end) {
+                    p.push(load(i));
+                }
+                return p;
+            }, []);
+            return Promise.all(requested).then(function () {
+                return setTime(time);
+            });
+        };
+
+        sidecars.reduce(function (p, sidecar, i) {
+            return p.then(function () {
+                return load(i);
+            });
+        }, Promise.resolve()).then(function () {
+            return setTime(K3DInstance.parameters.time);
+        });
+    },
+};
@@ -0,0 +1,36 @@
+import zlib
+import numpy as np
+import pytest
+
+from SimExporter.core.compression import iter_deflate
+
+
+def pieces(data, size):
+    view = memoryview(data)
+    return [view[i:i + size] for i in range(0, len(data), size)]
+
+
+@pytest.mark.parametrize('strategy', ['default', 'filtered', 'rle'])
+def test_parallel_deflate(strategy):
+    rng = np.random.default_rng(0)
+    # Compressible data with matches crossing the block boundaries
+    data = np.repeat(rng.integers(0, 16, 30000, dtype=np.uint8), 3).tobytes()
+    for block_size in (1000, 4096, 1 << 15, 1 << 20):
+        stream = b''.join(iter_deflate(pieces(data, 777), level=6, strategy=strategy, workers=4,
+                                       block_size=block_size))
+        assert zlib.decompress(stream) == data
+
+
+def test_parallel_deflate_empty():
+    assert zlib.decompress(b''.join(iter_deflate([], workers=4))) == b''
+    assert zlib.decompress(b''.join(iter_deflate([b''], workers=4, block_size=16))) == b''
+
+
+def test_sequential_deflate():
+    data = bytes(range(256)) * 100
+    assert zlib.decompress(b''.join(iter_deflate(pieces(data, 1000)))) == data
+
+
+def test_unknown_strategy():
+    with pytest.raises(ValueError):
+        list(iter_deflate([b'data'], strategy='unknown'))
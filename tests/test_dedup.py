@@ -0,0 +1,63 @@
+from hashlib import blake2b
+import numpy as np
+
+from SimExporter.core import dedup
+from SimExporter.core.dedup import deduplicate
+
+
+def resolve(obj, buffers):
+    if isinstance(obj, dict):
+        return {key[:-len('_ref')] if key.endswith('_ref') else key:
+                buffers[value] if key.endswith('_ref') else resolve(value, buffers) for key, value in obj.items()}
+    if isinstance(obj, list):
+        return [resolve(value, buffers) for value in obj]
+    return obj
+
+
+def test_key_ref():
+    rng = np.random.default_rng(0)
+    shared, other = rng.random(512), rng.random(512)
+    snapshot = {'objects': [{'id': 1, 'vertices': {'data': memoryview(shared.copy()), 'shape': [512]}},
+                            {'id': 2, 'vertices': {'0': {'data': memoryview(shared.copy())},
+                                                   '1': {'data': memoryview(other)}}}]}
+    deduplicated = deduplicate(snapshot)
+
+    # The shared buffer is stored once, the buffer with the same size but a different content is kept in place
+    assert len(deduplicated['buffers']) == 1
+    assert deduplicated['objects'][0]['vertices']['data_ref'] == 0
+    assert deduplicated['objects'][1]['vertices']['0']['data_ref'] == 0
+    assert 'data' in deduplicated['objects'][1]['vertices']['1']
+
+    # The references resolve to the original buffers, the snapshot is not modified
+    resolved = resolve(deduplicated['objects'], deduplicated['buffers'])
+    assert bytes(resolved[0]['vertices']['data']) == shared.tobytes()
+    assert bytes(resolved[1]['vertices']['0']['data']) == shared.tobytes()
+    assert bytes(resolved[1]['vertices']['1']['data']) == other.tobytes()
+    assert 'data' in snapshot['objects'][0]['vertices']
+
+
+def test_no_duplicates():
+    rng = np.random.default_rng(0)
+    snapshot = {'objects': [{'id': 1, 'data': memoryview(rng.random(512))},
+                            {'id': 2, 'data': memoryview(rng.random(512))},
+                            {'id': 3, 'data': memoryview(np.zeros(10))}]}
+    assert deduplicate(snapshot) is snapshot
+
+
+def test_prefilter(monkeypatch):
+    hashed = []
+    monkeypatch.setattr(dedup, 'blake2b', lambda buffer, **kwargs: hashed.append(buffer) or blake2b(buffer, **kwargs))
+
+    # The frames of a time series have the same size but different contents, they are not hashed
+    rng = np.random.default_rng(0)
+    frames = {str(i): {'data': memoryview(rng.random(1000))} for i in range(100)}
+    snapshot = {'objects': [{'id': 1, 'vertices': frames}]}
+    assert deduplicate(snapshot) is snapshot
+    assert len(hashed) == 0
+
+    # Buffers that only differ between the sampled bytes are hashed and kept apart
+    first, second = np.zeros(100000), np.zeros(100000)
+    second[12345] = 1.
+    snapshot = {'objects': [{'id': 1, 'data': memoryview(first)}, {'id': 2, 'data': memoryview(second)}]}
+    assert deduplicate(snapshot) is snapshot
+    assert len(hashed) == 2
@@ -0,0 +1,37 @@
+import numpy as np
+from k3d import Plot
+
+from SimExporter.core.factory import Factory, convert_color, convert_colors
+
+
+def test_plot_instance():
+    plt = Plot()
+    factory = Factory(plt=plt, animation=False)
+    factory.add_points(positions=np.random.default_rng(0).random((10, 3)))
+    assert len(plt.objects) == 1
+
+
+def test_plot_getter():
+    plots = []
+
+    def get_plot():
+        if len(plots) == 0:
+            plots.append(Plot())
+        return plots[0]
+
+    factory = Factory(plt=get_plot, animation=False)
+    assert len(plots) == 0
+    factory.add_points(positions=np.random.default_rng(0).random((10, 3)))
+    factory.add_points(positions=np.random.default_rng(1).random((10, 3)))
+    assert len(plots[0].objects) == 2
+
+
+def test_convert_colors():
+    rgb = np.random.default_rng(0).random((20, 3))
+    assert (convert_colors(rgb) == [convert_color(list(c)) for c in rgb]).all()
+    assert (convert_colors(['red', 'blue']) == [0xff0000, 0x0000ff]).all()
+    hex_values = np.array([1, 2, 3], dtype=np.uint32)
+    assert convert_colors(hex_values) is hex_values
+
+    # Lists mixing color names and [R, G, B] values
+    assert (convert_colors(['red', [0, 0, 1], (0, 255, 0)]) == [0xff0000, 0x0000ff, 0x00ff00]).all()
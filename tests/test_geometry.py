@@ -0,0 +1,130 @@
+from itertools import permutations, product
+import numpy as np
+
+from SimExporter.core.geometry import boundary_faces, compact_vertices, decimate, triangulate, is_polygons
+
+
+def grid(n):
+    positions = np.array(list(product(range(n + 1), repeat=3)), dtype=float)[:, ::-1]
+    index = {tuple(p): i for i, p in enumerate(positions.astype(int))}
+    return positions, index
+
+
+def hex_cube(n):
+    positions, index = grid(n)
+    corners = [(0, 0, 0), (1, 0, 0), (1, 1, 0), (0, 1, 0), (0, 0, 1), (1, 0, 1), (1, 1, 1), (0, 1, 1)]
+    cells = [[index[(x + dx, y + dy, z + dz)] for dx, dy, dz in corners] for x, y, z in product(range(n), repeat=3)]
+    return positions, np.array(cells)
+
+
+def tet_cube(n):
+    # Kuhn subdivision: the 6 tetrahedra of each cube follow the paths from (0, 0, 0) to (1, 1, 1) along the axes,
+    # the tetrahedra of neighbouring cubes share their faces (with both orientations)
+    positions, index = grid(n)
+    cells = []
+    for x, y, z in product(range(n), repeat=3):
+        for axes in permutations(range(3)):
+            vertex = np.array([x, y, z])
+            cell = [index[tuple(vertex)]]
+            for axis in axes:
+                vertex[axis] += 1
+                cell.append(index[tuple(vertex)])
+            cells.append(cell)
+    return positions, np.array(cells)
+
+
+def check_outward(positions, faces, n):
+    center = np.full(3, n / 2)
+    points = positions[faces]
+    normals = np.cross(points[:, 1] - points[:, 0], points[:, 2] - points[:, 0])
+    assert (np.einsum('ij,ij->i', normals, points.mean(axis=1) - center) > 0).all()
+    # Closed surface: the area vectors sum to zero
+    assert np.allclose(normals.sum(axis=0), 0.)
+
+
+def test_hex_cube():
+    positions, cells = hex_cube(2)
+    faces = boundary_faces(positions, cells)
+    assert faces.shape == (24, 4)
+    check_outward(positions, faces, 2)
+    # Flipped cells are oriented outward too
+    cells[::2] = cells[::2][:, [4, 5, 6, 7, 0, 1, 2, 3]]
+    check_outward(positions, boundary_faces(positions, cells), 2)
+
+
+def test_tet_cube():
+    positions, cells = tet_cube(2)
+    faces = boundary_faces(positions, cells)
+    assert faces.shape == (48, 3)
+    check_outward(positions, faces, 2)
+
+
+def test_compact_vertices():
+    positions = np.random.default_rng(0).random((10, 3))
+    cells = np.array([[7, 2, 5], [5, 2, 9]])
+    compacted, vertex_map = compact_vertices(cells)
+    assert len(vertex_map) == 4
+    assert (positions[vertex_map][compacted] == positions[cells]).all()
+
+    # Cells with different numbers of vertices
+    cells = [[7, 2, 5, 1], [5, 2, 9]]
+    compacted, vertex_map = compact_vertices(cells)
+    assert len(vertex_map) == 5
+    for cell, compacted_cell in zip(cells, compacted):
+        assert (positions[vertex_map][compacted_cell] == positions[cell]).all()
+
+
+def plane(n):
+    # Regular grid of n x n quads on a wavy surface, split in triangles
+    x, y = np.meshgrid(np.linspace(0., 1., n + 1), np.linspace(0., 1., n + 1), indexing='ij')
+    positions = np.stack([x.ravel(), y.ravel(), 0.1 * np.sin(6 * x.ravel())], axis=1)
+    i, j = np.meshgrid(np.arange(n), np.arange(n), indexing='ij')
+    corner = (i * (n + 1) + j).ravel()
+    quads = np.stack([corner, corner + n + 1, corner + n + 2, corner + 1], axis=1)
+    return positions, np.concatenate([quads[:, [0, 1, 2]], quads[:, [0, 2, 3]]])
+
+
+def test_decimate():
+    positions, cells = plane(60)
+    for budget in (10, 500, 3000):
+        triangles, vertex_map = decimate(positions, cells, triangle_budget=budget)
+        assert 0 < len(triangles) <= budget
+        assert triangles.max() < len(vertex_map)
+        # The kept vertices are original vertices, the triangles are not degenerated
+        assert len(np.unique(vertex_map)) == len(vertex_map) and vertex_map.max() < len(positions)
+        assert (np.sort(triangles, axis=1)[:, :-1] != np.sort(triangles, axis=1)[:, 1:]).all()
+
+
+def test_decimate_under_budget():
+    positions, cells = plane(10)
+    triangles, vertex_map = decimate(positions, cells, triangle_budget=len(cells))
+    assert (triangles == cells).all()
+    assert (vertex_map == np.arange(len(positions))).all()
+
+
+def test_triangulate():
+    triangles = np.array([[0, 1, 2], [2, 1, 3]])
+    assert (triangulate(triangles) == triangles).all()
+    assert (triangulate(np.array([[0, 1, 2, 3]])) == [[0, 1, 2], [0, 2, 3]]).all()
+    assert (triangulate(np.array([[4, 3, 2, 1, 0]])) == [[4, 3, 2], [4, 2, 1], [4, 1, 0]]).all()
+
+    # Cells with different numbers of vertices are grouped by size
+    result = triangulate([[0, 1, 2], [3, 4, 5, 6], [7, 8, 9], [0, 2, 4, 6, 8]])
+    assert sorted(map(tuple, result.tolist())) == sorted([(0, 1, 2), (7, 8, 9), (3, 4, 5), (3, 5, 6), (0, 2, 4),
+                                                          (0, 4, 6), (0, 6, 8)])
+    assert triangulate([]).shape == (0, 3)
+
+
+def test_is_polygons():
+    assert is_polygons(np.array([[0, 1, 2]]), n_vertices=3)
+    assert is_polygons([[0, 1, 2], [0, 1, 2, 3]], n_vertices=4)
+
+    # Invalid cells fall back to the VTK conversion
+    assert not is_polygons(np.array([[0, 1, 3]]), n_vertices=3)
+    assert not is_polygons(np.array([[-1, 1, 2]]), n_vertices=3)
+    assert not is_polygons(np.array([[0., 1., 2.]]), n_vertices=3)
+    assert not is_polygons(np.array([[0, 1]]), n_vertices=3)
+    assert not is_polygons([[0, 1, 2], [0, 1]], n_vertices=3)
+    assert not is_polygons([[0, 1, 2], [0, 1, 5]], n_vertices=3)
+    assert not is_polygons([], n_vertices=3)
+    assert not is_polygons(np.zeros((0, 3), dtype=int), n_vertices=3)
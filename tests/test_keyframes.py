@@ -0,0 +1,32 @@
+import numpy as np
+
+from SimExporter.core.keyframes import get_keyframes
+
+
+def interpolation_error(frames, times, start, end):
+    weights = ((times[start + 1:end] - times[start]) / (times[end] - times[start]))[:, None, None]
+    interpolated = frames[start] + weights * (frames[end] - frames[start])
+    return np.abs(interpolated - frames[start + 1:end]).max(initial=0.)
+
+
+def test_static_series():
+    frames = np.zeros((2000, 50, 3), dtype=np.float32)
+    assert get_keyframes(frames, tolerance=1e-3) == [0, 1999]
+
+
+def test_linear_series():
+    frames = np.linspace(0., 1., 500, dtype=np.float64)[:, None, None] * np.ones((1, 10, 3))
+    assert get_keyframes(frames, tolerance=1e-6) == [0, 499]
+
+
+def test_error_bound():
+    rng = np.random.default_rng(0)
+    for tolerance in (1e-3, 0.1, 1.):
+        frames = np.cumsum(rng.normal(size=(200, 20, 3)), axis=0)
+        times = np.cumsum(rng.random(200) + 0.1)
+        for t in (None, times):
+            keyframes = get_keyframes(frames, tolerance=tolerance, times=t)
+            assert keyframes[0] == 0 and keyframes[-1] == 199
+            t = np.arange(200, dtype=float) if t is None else t
+            for start, end in zip(keyframes[:-1], keyframes[1:]):
+                assert interpolation_error(frames, t, start, end) <= tolerance * (1 + 1e-9)
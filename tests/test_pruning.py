@@ -0,0 +1,38 @@
+import numpy as np
+
+from SimExporter.core.pruning import prune_mesh
+from SimExporter.core.snapshot import array_to_json
+
+
+def mesh(n_vertices, indices):
+    positions = np.arange(n_vertices * 3, dtype=np.float32).reshape(-1, 3)
+    return positions, {'id': 1, 'type': 'Mesh', 'vertices': array_to_json(positions),
+                       'indices': array_to_json(indices.astype(np.uint32))}
+
+
+def to_array(value):
+    return np.frombuffer(value['data'], dtype=value['dtype']).reshape(value['shape'])
+
+
+def test_narrow_indices():
+    for n_used, dtype in ((1 << 16, 'uint16'), ((1 << 16) + 1, 'uint32')):
+        indices = np.resize(np.arange(n_used), (-(-n_used // 3), 3))
+        _, obj = mesh(n_used + 10, indices)
+        pruned = prune_mesh(obj)
+        assert pruned['indices']['dtype'] == dtype
+        assert tuple(pruned['vertices']['shape']) == (n_used, 3)
+
+
+def test_prune_vertices():
+    indices = np.array([[7, 2, 5], [5, 2, 9]])
+    positions, obj = mesh(12, indices)
+    pruned = prune_mesh(obj)
+    assert tuple(pruned['vertices']['shape']) == (4, 3)
+    assert (to_array(pruned['vertices'])[to_array(pruned['indices'])] == positions[indices]).all()
+
+
+def test_nothing_to_prune():
+    _, obj = mesh(3, np.array([[0, 1, 2]]))
+    obj['indices'] = array_to_json(np.array([[0, 1, 2]], dtype=np.uint16))
+    assert prune_mesh(obj) is None
+    assert prune_mesh({'type': 'Points'}) is None
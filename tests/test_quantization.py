@@ -0,0 +1,25 @@
+import numpy as np
+
+from SimExporter.core.quantization import quantize_array, dequantize_array
+from SimExporter.core.snapshot import array_to_json
+
+
+def test_error_bound():
+    rng = np.random.default_rng(0)
+    values = rng.uniform(-100., 100., (1000, 3)).astype(np.float32)
+    for error, dtype in ((1., 'uint8'), (1e-2, 'int16'), (5e-3, 'int16')):
+        quantized = quantize_array(array_to_json(values), error)
+        assert quantized['quantized_dtype'] == dtype
+        restored = dequantize_array(quantized).reshape(quantized['shape'])
+        assert np.abs(restored.astype(np.float64) - values).max() <= error
+
+
+def test_unsatisfiable_bound():
+    values = np.linspace(0., 1000., 100, dtype=np.float32)
+    assert quantize_array(array_to_json(values), 1e-4) is None
+    assert quantize_array(array_to_json(values.astype(np.uint32)), 1.) is None
+
+
+def test_constant_values():
+    values = np.full(10, 3.5, dtype=np.float32)
+    assert (dequantize_array(quantize_array(array_to_json(values), 1e-6)) == values).all()
@@ -0,0 +1,37 @@
+import numpy as np
+
+from SimExporter.core import Exporter
+from SimExporter.core.scene import load_scene, get_bounds
+
+
+def to_array(value):
+    return np.frombuffer(value['data'], dtype=value['dtype']).reshape(value['shape'])
+
+
+def test_round_trip(tmp_path):
+    positions = np.random.default_rng(0).random((100, 3), dtype=np.float32)
+    exporter = Exporter()
+    exporter.objects.add_points(positions=positions)
+    exporter.save(filename=str(tmp_path / 'scene.bin'))
+
+    snapshot = load_scene(str(tmp_path / 'scene.bin'))
+    assert (to_array(snapshot['objects'][0]['positions']) == positions).all()
+    assert np.allclose(snapshot['bounds'], get_bounds(snapshot['objects']))
+
+
+def test_load_offset(tmp_path):
+    positions = np.random.default_rng(0).random((100, 3), dtype=np.float32)
+    exporter = Exporter()
+    exporter.objects.add_points(positions=positions)
+    exporter.save(filename=str(tmp_path / 'scene.bin'))
+
+    # Load the same scene twice, the second one is translated with its model matrix
+    offset = [10., -2., 0.5]
+    merged = Exporter()
+    merged.load(filename=str(tmp_path / 'scene.bin'))
+    merged.load(filename=str(tmp_path / 'scene.bin'), offset=offset)
+    first, second = merged.get_snapshot()['objects']
+    assert first['id'] != second['id']
+    assert (to_array(second['positions']) == positions).all()
+    matrix = to_array(second['model_matrix']).reshape(4, 4) @ to_array(first['model_matrix']).reshape(4, 4)
+    assert np.allclose(matrix[:3, 3], offset)
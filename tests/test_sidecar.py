@@ -0,0 +1,58 @@
+import numpy as np
+import pytest
+
+from SimExporter.core.sidecar import split_time_series, is_time_series
+from SimExporter.core.snapshot import array_to_json
+
+
+def series(times):
+    return {str(t): array_to_json(np.full(3, t, dtype=np.float32)) for t in times}
+
+
+def snapshot():
+    return {'objects': [{'id': 1, 'type': 'Mesh', 'vertices': series(range(20)), 'attribute': series(range(0, 20, 3)),
+                         'indices': array_to_json(np.arange(3, dtype=np.uint32))},
+                        {'id': 2, 'type': 'Points', 'positions': series([0.5, 2.25, 7.0, 7.5, 30.0]),
+                         'colors': series([1.0, 2.0])}],
+            'plot': {'fps': 25.}}
+
+
+def test_is_time_series():
+    assert is_time_series(series([0, 1]))
+    assert not is_time_series({})
+    assert not is_time_series(array_to_json(np.zeros(3)))
+    assert not is_time_series({'a': array_to_json(np.zeros(3))})
+
+
+@pytest.mark.parametrize('frames_per_file', [1, 4, 100])
+def test_split(frames_per_file):
+    original = snapshot()
+    reduced, chunks = split_time_series(original, frames_per_file)
+
+    for obj, reduced_obj in zip(original['objects'], reduced['objects']):
+        for name, value in obj.items():
+            if not is_time_series(value):
+                assert reduced_obj[name] is value
+                continue
+
+            # The first and last frames stay in the snapshot (the short series are kept whole)
+            keys = sorted(value, key=float)
+            assert set(reduced_obj[name]) == ({keys[0], keys[-1]} if len(keys) > 2 else set(keys))
+
+            # Each inner frame is in exactly one chunk, within the time range of the chunk
+            for key in keys[1:-1]:
+                found = [chunk for chunk in chunks for chunk_obj in chunk['objects']
+                         if chunk_obj['id'] == obj['id'] and key in chunk_obj.get(name, {})]
+                assert len(found) == 1
+                assert found[0]['start'] <= float(key) <= found[0]['end']
+                assert next(o for o in found[0]['objects'] if o['id'] == obj['id'])[name][key] is value[key]
+
+    # The chunks are ordered, do not overlap and contain at most 'frames_per_file' time values
+    for chunk, next_chunk in zip(chunks[:-1], chunks[1:]):
+        assert chunk['start'] <= chunk['end'] < next_chunk['start']
+    for chunk in chunks:
+        times = {float(key) for obj in chunk['objects'] for name, value in obj.items() if name != 'id' for key in value}
+        assert 0 < len(times) <= frames_per_file
+
+    # The snapshot is not modified
+    assert len(original['objects'][0]['vertices']) == 20
@@ -0,0 +1,33 @@
+import numpy as np
+import msgpack
+import pytest
+
+from SimExporter.core.snapshot import iter_packb, array_to_json
+
+
+def snapshot():
+    rng = np.random.default_rng(0)
+    return {'objects': [{'id': 1, 'type': 'Mesh', 'name': None, 'visible': True, 'opacity': 0.5,
+                         'vertices': array_to_json(rng.random((100, 3), dtype=np.float32)),
+                         'indices': array_to_json(np.arange(30, dtype=np.uint32)),
+                         'attribute': {str(i): array_to_json(rng.random(n, dtype=np.float32))
+                                       for i, n in enumerate((10, 63, 64, 65, 20000))}},
+                        {'id': 2, 'type': 'Points', 'positions': rng.bytes(70000), 'colors': bytearray(300),
+                         'model_matrix': [1., 0., 0., 0.], 'color_range': (0, -1, 1 << 40)}],
+            'plot': {'camera': [], 'fps': 25.}}
+
+
+@pytest.mark.parametrize('chunk_size', [1, 7, 64, 255, 1000, 1 << 20])
+def test_same_as_packb(chunk_size):
+    obj = snapshot()
+    pieces = list(iter_packb(obj, chunk_size=chunk_size))
+    assert b''.join(pieces) == msgpack.packb(obj, use_bin_type=True)
+
+
+def test_buffers_not_copied():
+    data = np.arange(1000, dtype=np.float32)
+    pieces = list(iter_packb({'data': memoryview(data)}, chunk_size=1000))
+    # The buffer is sliced in pieces of the chunk size that share the memory of the array
+    views = [piece for piece in pieces if isinstance(piece, memoryview)]
+    assert len(views) == 4 and all(len(view) <= 1000 for view in views)
+    assert all(np.shares_memory(np.frombuffer(view, dtype=np.uint8), data) for view in views)
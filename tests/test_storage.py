@@ -0,0 +1,112 @@
+import numpy as np
+import pytest
+
+from SimExporter.sofa.storage import FrameBuffer, DiskFrameBuffer, load_frames
+
+
+def record(n_frames, seed=0):
+    # Runs of equal frames of random lengths, with single different frames between them
+    rng = np.random.default_rng(seed)
+    frames, value = [], rng.random((5, 3), dtype=np.float32)
+    while len(frames) < n_frames:
+        frames += [value] * int(rng.integers(1, 5))
+        value = rng.random((5, 3), dtype=np.float32)
+    return np.array(frames[:n_frames])
+
+
+def rebuild(frames, times, n_frames):
+    # Linear interpolation of the recorded frames between the stored frames
+    times = np.asarray(times)
+    rows = np.searchsorted(times, np.arange(n_frames), side='right') - 1
+    following = np.minimum(rows + 1, len(times) - 1)
+    span = np.maximum(times[following] - times[rows], 1)
+    weights = ((np.arange(n_frames) - times[rows]) / span)[:, None, None]
+    return frames[rows] + weights * (frames[following] - frames[rows])
+
+
+def test_load_frames_without_close(tmp_path):
+    filename = str(tmp_path / 'frames.bin')
+    recorded = record(50)
+    buffer = DiskFrameBuffer(first_frame=recorded[0], filename=filename, window=4)
+    for frame in recorded[1:]:
+        buffer.append(frame)
+
+    # Simulate a crash: the buffer is not closed and the last frame is partially written
+    with open(filename, 'ab') as file:
+        file.write(b'\x00' * 7)
+    frames, times = load_frames(filename)
+
+    # The frames of the flushed windows are loaded with their times
+    assert len(frames) == len(times) > 4
+    assert times[0] == 0 and (np.diff(times) > 0).all()
+    assert (frames == recorded[times]).all()
+    n_frames = times[-1] + 1
+    assert np.array_equal(rebuild(np.asarray(frames), times, n_frames), recorded[:n_frames])
+    buffer.close()
+
+
+def create_buffer(kind, first_frame, tmp_path):
+    if kind == 'memory':
+        return FrameBuffer(first_frame=first_frame, capacity=2)
+    return DiskFrameBuffer(first_frame=first_frame, filename=str(tmp_path / 'frames.bin'), window=3)
+
+
+@pytest.mark.parametrize('kind', ['memory', 'disk'])
+def test_runs(kind, tmp_path):
+    a, b, c = (np.full((4, 3), value, dtype=np.float32) for value in (1., 2., 3.))
+    buffer = create_buffer(kind, a, tmp_path)
+    for frame in [a, a, b, c, c, c, c, a]:
+        buffer.append(frame)
+
+    # Each run of equal frames is stored as its first and last frames
+    assert len(buffer) == 9
+    assert buffer.times().tolist() == [0, 2, 3, 4, 7, 8]
+    assert [float(frame[0, 0]) for frame in buffer.array()] == [1., 1., 2., 3., 3., 1.]
+    assert not buffer.is_static()
+
+    # The recorded frames are resolved from the stored frames
+    expected = np.array([a, a, a, b, c, c, c, c, a])
+    assert np.array_equal(buffer.take(np.arange(9)), expected)
+    assert np.array_equal(buffer.take([8, 0, 5]), expected[[8, 0, 5]])
+    assert all(np.array_equal(buffer[i], expected[i]) for i in range(-9, 9))
+    assert np.array_equal(buffer[2:6], expected[2:6])
+    assert np.array_equal(buffer[::-2], expected[::-2])
+    buffer.close()
+
+
+@pytest.mark.parametrize('kind', ['memory', 'disk'])
+def test_static(kind, tmp_path):
+    frame = np.ones((4, 3), dtype=np.float32)
+    buffer = create_buffer(kind, frame, tmp_path)
+    assert buffer.is_static()
+    for _ in range(10):
+        buffer.append(frame)
+        assert buffer.is_static()
+    assert buffer.times().tolist() == [0, 10] and len(buffer) == 11
+    buffer.append(frame * 2)
+    assert not buffer.is_static()
+    buffer.close()
+
+
+@pytest.mark.parametrize('kind', ['memory', 'disk'])
+@pytest.mark.parametrize('seed', [0, 1, 2])
+def test_rebuild(kind, seed, tmp_path):
+    recorded = record(200, seed)
+    buffer = create_buffer(kind, recorded[0], tmp_path)
+    for frame in recorded[1:]:
+        buffer.append(frame)
+    buffer.close()
+
+    # Interpolating between the stored frames rebuilds the recorded series, with fewer stored frames
+    assert np.array_equal(rebuild(np.asarray(buffer.array()), buffer.times(), len(buffer)), recorded)
+    assert len(buffer.times()) < len(recorded)
+    if kind == 'disk':
+        frames, times = load_frames(str(tmp_path / 'frames.bin'))
+        assert np.array_equal(times, buffer.times()) and np.array_equal(frames, buffer.array())
+
+
+def test_closed_disk_buffer(tmp_path):
+    buffer = create_buffer('disk', np.zeros(3), tmp_path)
+    buffer.close()
+    with pytest.raises(ValueError):
+        buffer.append(np.ones(3))
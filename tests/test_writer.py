@@ -0,0 +1,18 @@
+from base64 import b64encode
+import numpy as np
+import pytest
+
+from SimExporter.core.writer import iter_b64encode
+
+
+@pytest.mark.parametrize('sizes', [[], [0], [1], [2, 2, 2], [1, 3, 5, 7, 11], [1000, 1, 0, 2, 4096], [3, 6, 9]])
+def test_same_as_b64encode(sizes):
+    data = np.random.default_rng(0).bytes(sum(sizes))
+    chunks, start = [], 0
+    for size in sizes:
+        chunks.append(data[start:start + size])
+        start += size
+    encoded = list(iter_b64encode(chunks))
+    assert b''.join(encoded) == b64encode(data)
+    # Padding only at the end of the stream
+    assert all(b'=' not in piece for piece in encoded[:-1])